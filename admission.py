@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Per-endpoint concurrency and how long a request may queue before it is shed
+CONCURRENCY_LIMIT = int(os.environ.get("ADMISSION_CONCURRENCY", 8))
+QUEUE_DEADLINE_SECONDS = float(os.environ.get("ADMISSION_QUEUE_DEADLINE_SECONDS", 2))
+
+# Characters each client may synthesize per sliding window
+QUOTA_CHARACTERS = int(os.environ.get("QUOTA_CHARACTERS", 20000))
+QUOTA_WINDOW_SECONDS = float(os.environ.get("QUOTA_WINDOW_SECONDS", 60))
+# API keys accepted as quota identities (comma-separated); any other key counts as its IP
+QUOTA_API_KEYS = {key.strip() for key in os.environ.get("QUOTA_API_KEYS", "").split(",") if key.strip()}
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class QuotaExceeded(Exception):
+    """Raised when a client has used up its character quota for the window."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounded concurrency for one endpoint with queue-time based shedding.
+
+    A request waits for a slot at most until its deadline. If the queue ahead of it is
+    already longer than the deadline could cover (queue length x recent service time),
+    it is shed straight away instead of waiting to time out.
+    """
+
+    def __init__(self, name, limit=CONCURRENCY_LIMIT, deadline_seconds=QUEUE_DEADLINE_SECONDS):
+        self.name = name
+        self.limit = limit
+        self.deadline_seconds = deadline_seconds
+        self._cond = threading.Condition()
+        self.active = 0
+        self.queued = 0
+        self.service_seconds = 0.0  # moving average of time spent holding a slot (0 = no data yet)
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def _estimated_wait(self):
+        return (self.queued + 1) * self.service_seconds / self.limit
+
+    def acquire(self, deadline_seconds=None):
+        deadline_seconds = self.deadline_seconds if deadline_seconds is None else deadline_seconds
+        with self._cond:
+            if self.active >= self.limit:
+                if self._estimated_wait() > deadline_seconds:
+                    self.shed += 1
+                    raise Overloaded(f"{self.name} is overloaded", retry_after=max(1, round(self._estimated_wait())))
+                self.queued += 1
+                try:
+                    if not self._cond.wait_for(lambda: self.active < self.limit, deadline_seconds):
+                        self.timed_out += 1
+                        raise Overloaded(f"{self.name} queue wait exceeded {deadline_seconds}s",
+                                         retry_after=max(1, round(self._estimated_wait())))
+                finally:
+                    self.queued -= 1
+            self.active += 1
+            self.admitted += 1
+        return time.perf_counter()
+
+    def release(self, started):
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.active -= 1
+            if self.service_seconds:
+                self.service_seconds = 0.9 * self.service_seconds + 0.1 * elapsed
+            else:
+                self.service_seconds = elapsed
+            self._cond.notify()
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "queued": self.queued,
+                "avg_service_seconds": round(self.service_seconds, 3),
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "timed_out": self.timed_out
+            }
+
+class CharacterQuota:
+    """Sliding-window character budget per client (API key or IP)."""
+
+    def __init__(self, max_characters=QUOTA_CHARACTERS, window_seconds=QUOTA_WINDOW_SECONDS):
+        self.max_characters = max_characters
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._usage = {}  # client -> [deque of (timestamp, characters), total]
+        self.rejected = 0
+
+    def charge(self, client, characters):
+        now = time.monotonic()
+        with self._lock:
+            events, total = self._usage.get(client, (deque(), 0))
+            while events and events[0][0] <= now - self.window_seconds:
+                total -= events.popleft()[1]
+            if total + characters > self.max_characters:
+                self._usage[client] = (events, total)
+                self.rejected += 1
+                retry_after = events[0][0] + self.window_seconds - now if events else self.window_seconds
+                raise QuotaExceeded(
+                    f"Character quota exceeded ({total}/{self.max_characters} in {self.window_seconds:.0f}s)",
+                    retry_after=max(1, round(retry_after))
+                )
+            events.append((now, characters))
+            self._usage[client] = (events, total + characters)
+            self._forget_idle(now)
+
+    def _forget_idle(self, now):
+        # Keep memory bounded by dropping clients whose window has fully expired
+        if len(self._usage) > 10000:
+            cutoff = now - self.window_seconds
+            for client in [c for c, (events, _) in self._usage.items() if not events or events[-1][0] <= cutoff]:
+                del self._usage[client]
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "max_characters": self.max_characters,
+                "window_seconds": self.window_seconds,
+                "tracked_clients": len(self._usage),
+                "rejected": self.rejected
+            }
@@ -1,12 +1,29 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, url_for, copy_current_request_context, g
 from flask_cors import CORS
-import elevenlabs
+from elevenlabs.core.api_error import ApiError
 import os
-import tempfile
-import uuid
+import re
+import json
+import contextlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 
+from pydub import AudioSegment
+
+import audio_formats
+import audio_processing
+import eleven
+import providers
+import upstream
+from admission import QUOTA_API_KEYS, AdmissionController, CharacterQuota, Overloaded, QuotaExceeded
+from audio_store import AudioStore, request_key
+from memory_budget import BUDGET, BudgetExhausted, SpillBuffer
+from scene_jobs import SceneRegistry
+from voices import catalog, UnknownVoiceError
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,22 +31,299 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# API Keys (Replace with your actual keys or use environment variables)
-ELEVENLABS_API_KEY = os.environ["ELEVENLABS_API_KEY"]
-
-# Available voices for ElevenLabs
-AVAILABLE_VOICES = {
-    "rachel": "21m00Tcm4TlvDq8ikWAM",      # Female voice
-    "domi": "AZnzlk1XvdvUeBnXmlld",        # Female voice
-    "bella": "EXAVITQu4vr4xnSDxMaL",       # Female voice
-    "antoni": "ErXwobaYiN1P8YkM0tQj",      # Male voice
-    "thomas": "GBv7mTt0atIp3Br8iCZE",      # Male voice
-    "josh": "TxGEqnHWrfWFTfGW9XjX",        # Male voice
-    "arnold": "VR6AewLTigWG4xSOukaG",      # Male voice
-    "adam": "pNInz6obpgDQGcFmaJgB",        # Male voice
-    "sam": "yoZ06aMxZJJ28mfd3POQ",         # Male voice
-    "default": "21m00Tcm4TlvDq8ikWAM"     # Default voice
-}
+MODEL_ID = "eleven_monolingual_v1"
+
+# Generated audio, addressed by content hash and reused across requests
+store = AudioStore()
+AUDIO_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+AUDIO_MAX_AGE = 365 * 24 * 3600  # content-addressed, so it never changes
+
+def synthesize(text, voice_id, upstream_format):
+    """
+    Calls the fastest healthy TTS provider and returns (backend name, iterator over the
+    audio bytes in the given upstream format).
+    """
+    return providers.tts.synthesize(text, voice_id, upstream_format, MODEL_ID)
+
+def audio_key(text, voice_id, output_format, backend):
+    """Store key of a line's audio as produced by the named TTS backend."""
+    return request_key(text=text, voice_id=voice_id, model_id=MODEL_ID,
+                       format=audio_formats.ALIASES.get(output_format, output_format),
+                       **providers.tts.cache_fields(backend))
+
+def get_dialogue_audio(text, voice_id, output_format=audio_formats.DEFAULT_FORMAT):
+    """
+    Returns the stored object name of the audio for text/voice/format, generating it on a miss.
+
+    Formats ElevenLabs produces natively are requested as such. Anything else, or a native
+    format the account is not allowed to use, is transcoded locally from the cached default mp3.
+    Audio is buffered through the process memory budget and spills to disk when large.
+    """
+    return dialogue_audio(text, voice_id, output_format)[0]
+
+def dialogue_audio(text, voice_id, output_format=audio_formats.DEFAULT_FORMAT):
+    """(object name, backend name) for get_dialogue_audio."""
+    backend = providers.tts.preferred()
+    key = audio_key(text, voice_id, output_format, backend)
+    name = store.lookup(key)
+    if name:
+        return name, backend
+
+    fmt = audio_formats.FORMATS[output_format]
+    expected_bytes = audio_formats.estimate_size(text, output_format)
+    with store.lock(key):
+        # Another worker may have generated it while we waited for the lock
+        name = store.lookup(key)
+        if name:
+            return name, backend
+
+        if fmt["upstream"]:
+            try:
+                with SpillBuffer(expected_bytes) as buffer:
+                    backend, chunks = synthesize(text, voice_id, fmt["upstream"])
+                    audio_formats.write_upstream(chunks, output_format, buffer)
+                    buffer.seek(0)
+                    # Filed under the backend that answered, so audio from a failover is
+                    # never served later as the preferred backend's
+                    return store.put_file(audio_key(text, voice_id, output_format, backend), buffer, fmt["ext"]), backend
+            except ApiError as e:
+                if output_format == audio_formats.DEFAULT_FORMAT or e.status_code not in providers.REQUEST_ERRORS:
+                    raise
+                logger.info(f"Upstream rejected {fmt['upstream']} ({e.status_code}), transcoding locally")
+
+        source, backend = dialogue_audio(text, voice_id)
+        with SpillBuffer(expected_bytes) as buffer:
+            audio_formats.transcode(store.path(source), output_format, buffer)
+            buffer.seek(0)
+            return store.put_file(audio_key(text, voice_id, output_format, backend), buffer, fmt["ext"]), backend
+
+def stream_dialogue_audio(text, voice_id, output_format):
+    """
+    Starts generating audio the store doesn't have yet and returns (chunks, close): chunks
+    yields the audio as it arrives from the provider while writing it through a SpillBuffer
+    into the store, and close releases the key's lock and the buffer (call it when the
+    response closes, even if chunks was never read). Returns None when the audio is already
+    stored or has to be built locally (WAV, formats without an upstream equivalent, or a
+    format the account may not use); get_dialogue_audio handles those.
+    """
+    fmt = audio_formats.FORMATS[output_format]
+    if not fmt["upstream"] or output_format == "wav":
+        return None  # WAV needs its header patched once the length is known
+    key = audio_key(text, voice_id, output_format, providers.tts.preferred())
+    if store.lookup(key):
+        return None
+
+    held = contextlib.ExitStack()
+    try:
+        held.enter_context(store.lock(key))
+        # Another worker may have generated it while we waited for the lock
+        if store.lookup(key):
+            held.close()
+            return None
+        buffer = held.enter_context(SpillBuffer(audio_formats.estimate_size(text, output_format)))
+        backend, upstream_chunks = synthesize(text, voice_id, fmt["upstream"])
+    except ApiError as e:
+        held.close()
+        if output_format == audio_formats.DEFAULT_FORMAT or e.status_code not in providers.REQUEST_ERRORS:
+            raise
+        logger.info(f"Upstream rejected {fmt['upstream']} ({e.status_code}), transcoding locally")
+        return None
+    except BaseException:
+        held.close()
+        raise
+
+    def chunks():
+        for chunk in upstream_chunks:
+            buffer.write(chunk)
+            yield chunk
+        # Only a complete response is stored; a client that disconnects leaves nothing behind
+        buffer.seek(0)
+        store.put_file(audio_key(text, voice_id, output_format, backend), buffer, fmt["ext"])
+        held.close()
+
+    return chunks(), held.close
+
+# Scene rendering: lines are synthesized in parallel but reported in script order
+SCENE_WORKERS = 4
+SCENE_LEAD_IN_MS = 500
+SCENE_GAP_MS = 300
+scenes = SceneRegistry()
+
+def put_segment(key, segment):
+    """Encodes an AudioSegment to mp3 into the store and returns the object name."""
+    with SpillBuffer() as buffer:
+        segment.export(buffer, format="mp3")
+        buffer.seek(0)
+        return store.put_file(key, buffer, "mp3")
+
+def get_scene_clip(text, voice_id):
+    """Returns (object name, AudioSegment) of a line's silence-trimmed, loudness-normalized clip."""
+    raw = get_dialogue_audio(text, voice_id)
+    # Keyed by the raw clip, so it follows whichever backend produced that
+    key = request_key(source=raw, processed=True)
+    name = store.lookup(key)
+    if name:
+        return name, AudioSegment.from_mp3(store.path(name))
+    with store.lock(key):
+        name = store.lookup(key)
+        if name:
+            return name, AudioSegment.from_mp3(store.path(name))
+        clip = audio_processing.process_segments([AudioSegment.from_mp3(store.path(raw))])[0]
+        return put_segment(key, clip), clip
+
+def scene_memory_bytes(entries):
+    """
+    Rough memory a scene render holds: every decoded clip (16-bit PCM, the size of a WAV of
+    the line) plus the assembled scene, which is a second copy of all of them.
+    """
+    silence_ms = SCENE_LEAD_IN_MS + SCENE_GAP_MS * len(entries)
+    pcm_bytes = sum(audio_formats.estimate_size(e["line"], "wav") for e in entries)
+    pcm_bytes += int(silence_ms / 1000 * audio_formats.PCM_RATE * 2)
+    return 2 * pcm_bytes
+
+def render_scene_job(job, entries, release_admission=None, reserved_bytes=0):
+    """
+    Synthesizes a scene, emitting each clip as soon as it (and every line before it) is ready.
+    reserved_bytes of BUDGET, taken for the decoded audio, are returned when it finishes.
+    """
+    try:
+        names = []
+        clips = []
+        start_ms = SCENE_LEAD_IN_MS
+        timeline = []
+        with ThreadPoolExecutor(max_workers=SCENE_WORKERS) as executor:
+            futures = [executor.submit(get_scene_clip, e["line"], e["voice"]) for e in entries]
+            for index, (entry, future) in enumerate(zip(entries, futures)):
+                name, clip = future.result()
+                names.append(name)
+                clips.append(clip)
+                timing = {
+                    "index": index,
+                    "character": entry["character"],
+                    "line": entry["line"],
+                    "audio_url": audio_url(name),
+                    "start_ms": start_ms,
+                    "duration_ms": len(clip)
+                }
+                timeline.append(timing)
+                job.emit("clip", **timing)
+                start_ms += len(clip) + SCENE_GAP_MS
+
+        key = request_key(scene=names, lead_in_ms=SCENE_LEAD_IN_MS, gap_ms=SCENE_GAP_MS)
+        name = store.lookup(key)
+        if name is None:
+            scene_audio = AudioSegment.silent(duration=SCENE_LEAD_IN_MS)
+            for clip in clips:
+                scene_audio += clip + AudioSegment.silent(duration=SCENE_GAP_MS)
+            name = put_segment(key, scene_audio)
+        job.emit("scene", audio_url=audio_url(name), duration_ms=start_ms, timeline=timeline)
+        logger.info(f"Scene {job.id} rendered: {len(entries)} lines")
+    except Exception as e:
+        logger.error(f"Error rendering scene {job.id}: {str(e)}")
+        job.emit("error", error="Failed to render scene", details=str(e))
+    finally:
+        job.close()
+        BUDGET.release(reserved_bytes)
+        if release_admission:
+            release_admission()
+
+def scene_event_response(job, stream_format=None, start=0):
+    """Streams a scene job's events as SSE, or as NDJSON when stream_format is 'ndjson'."""
+    if stream_format == 'ndjson':
+        def generate():
+            for item in job.iter_events(start):
+                yield "\n" if item is None else json.dumps(item[1]) + "\n"
+        return app.response_class(generate(), mimetype='application/x-ndjson')
+    
+    def generate():
+        for item in job.iter_events(start):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            index, event = item
+            yield f"id: {index}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return app.response_class(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Admission control: bounded concurrency per endpoint plus per-client character quotas
+admission = {}
+quota = CharacterQuota()
+
+def client_id():
+    """
+    Quota identity: the API key when it is one of QUOTA_API_KEYS, otherwise the caller's
+    address, so made-up keys can't be used to get a fresh quota per request.
+    """
+    key = request.headers.get('X-API-Key')
+    return key if key in QUOTA_API_KEYS else request.remote_addr
+
+def charge_quota(characters):
+    """
+    Charges the caller's character quota. Views call it once the request has been admitted
+    and validated, so shed and invalid requests cost nothing. Returns a 429 response when
+    the quota is used up, otherwise None.
+    """
+    try:
+        quota.charge(client_id(), characters)
+    except QuotaExceeded as e:
+        response = jsonify({
+            "error": "Quota exceeded",
+            "details": str(e)
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return None
+
+def admit(view):
+    """
+    Decorator applying the endpoint's admission controller. Shed requests get 503 with
+    Retry-After. Clients may shorten the queue deadline with X-Queue-Deadline-Ms.
+    """
+    controller = admission.setdefault(view.__name__, AdmissionController(view.__name__))
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        deadline = None
+        if request.headers.get('X-Queue-Deadline-Ms', '').isdigit():
+            # The header can only shorten the server's deadline, never extend it
+            deadline = min(int(request.headers['X-Queue-Deadline-Ms']) / 1000, controller.deadline_seconds)
+        try:
+            started = controller.acquire(deadline)
+        except Overloaded as e:
+            logger.warning(f"Shedding request: {str(e)}")
+            return busy_response(e)
+
+        # A view that hands its work to a background thread takes over releasing the slot
+        g.release_admission = functools.partial(controller.release, started)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            release = g.pop('release_admission', None)
+            if release:
+                release()
+    return wrapper
+
+def audio_url(name):
+    return url_for('get_audio', name=name)
+
+def busy_response(error):
+    response = jsonify({
+        "error": "Server is busy, please retry",
+        "details": str(error)
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def unsupported_format_response(output_format):
+    return jsonify({
+        "error": f"Unsupported output_format: '{output_format}'",
+        "supported_formats": list(audio_formats.FORMATS)
+    }), 400
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -42,13 +336,14 @@ def health_check():
 
 @app.route('/voices', methods=['GET'])
 def get_available_voices():
-    """Get list of available voices"""
+    """Get list of available voices (served from the cached voice catalog)"""
     return jsonify({
-        "voices": AVAILABLE_VOICES,
+        "voices": catalog.voices(),
         "message": "Available voices for audio generation"
     })
 
 @app.route('/generate-dialogue-audio', methods=['POST'])
+@admit
 def generate_dialogue_audio():
     """
     Generate dialogue audio from text using ElevenLabs API
@@ -86,41 +381,46 @@ def generate_dialogue_audio():
         
         # Get voice ID
         voice_input = data.get('voice_id', 'default')
-        voice_id = AVAILABLE_VOICES.get(voice_input.lower(), voice_input)
+        try:
+            voice_id = catalog.resolve(voice_input)
+        except UnknownVoiceError as e:
+            return jsonify({
+                "error": str(e),
+                "available_voices": list(catalog.voices())
+            }), 400
         
         # Get output format
-        output_format = data.get('output_format', 'mp3')
+        output_format = data.get('output_format', audio_formats.DEFAULT_FORMAT).lower()
+        if output_format not in audio_formats.FORMATS:
+            return unsupported_format_response(output_format)
+
+        over_quota = charge_quota(len(text))
+        if over_quota:
+            return over_quota
+        fmt = audio_formats.FORMATS[output_format]
         
         logger.info(f"Generating audio for text: {text[:50]}... with voice: {voice_id}")
         
-        # Initialize ElevenLabs client
-        client = elevenlabs.ElevenLabs(api_key=ELEVENLABS_API_KEY)
-        
-        # Generate audio
-        audio_data = client.generate(
-            text=text,
-            voice=voice_id,
-            model="eleven_monolingual_v1"
-        )
-        
-        # Create temporary file
-        temp_dir = tempfile.gettempdir()
-        filename = f"dialogue_{uuid.uuid4().hex[:8]}.{output_format}"
-        file_path = os.path.join(temp_dir, filename)
-        
-        with open(file_path, "wb") as f:
-            f.write(audio_data)
+        # Generate audio (or reuse the cached result)
+        name = get_dialogue_audio(text, voice_id, output_format)
+        file_path = store.path(name)
         
         logger.info(f"Audio generated successfully: {file_path}")
         
         # Return audio file and metadata
-        return send_file(
+        response = send_file(
             file_path,
             as_attachment=True,
-            download_name=filename,
-            mimetype=f'audio/{output_format}'
+            download_name=f"dialogue_{name[:8]}.{fmt['ext']}",
+            mimetype=fmt["mimetype"],
+            etag=name.split('.')[0]
         )
+        response.headers['Content-Location'] = audio_url(name)
+        return response
         
+    except BudgetExhausted as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        return busy_response(e)
     except Exception as e:
         logger.error(f"Error generating dialogue audio: {str(e)}")
         return jsonify({
@@ -129,6 +429,7 @@ def generate_dialogue_audio():
         }), 500
 
 @app.route('/generate-dialogue-audio-stream', methods=['POST'])
+@admit
 def generate_dialogue_audio_stream():
     """
     Generate dialogue audio and return as streaming response
@@ -136,7 +437,8 @@ def generate_dialogue_audio_stream():
     Expected JSON payload:
     {
         "text": "The dialogue text to convert to speech",
-        "voice_id": "voice_id_or_name" (optional, defaults to "default")
+        "voice_id": "voice_id_or_name" (optional, defaults to "default"),
+        "output_format": "mp3" (optional, defaults to "mp3")
     }
     
     Returns:
@@ -164,29 +466,51 @@ def generate_dialogue_audio_stream():
         
         # Get voice ID
         voice_input = data.get('voice_id', 'default')
-        voice_id = AVAILABLE_VOICES.get(voice_input.lower(), voice_input)
+        try:
+            voice_id = catalog.resolve(voice_input)
+        except UnknownVoiceError as e:
+            return jsonify({
+                "error": str(e),
+                "available_voices": list(catalog.voices())
+            }), 400
         
-        logger.info(f"Generating streaming audio for text: {text[:50]}... with voice: {voice_id}")
+        # Get output format
+        output_format = data.get('output_format', audio_formats.DEFAULT_FORMAT).lower()
+        if output_format not in audio_formats.FORMATS:
+            return unsupported_format_response(output_format)
+
+        over_quota = charge_quota(len(text))
+        if over_quota:
+            return over_quota
         
-        # Initialize ElevenLabs client
-        client = elevenlabs.ElevenLabs(api_key=ELEVENLABS_API_KEY)
+        logger.info(f"Generating streaming audio for text: {text[:50]}... with voice: {voice_id}")
         
-        # Generate audio
-        audio_data = client.generate(
-            text=text,
-            voice=voice_id,
-            model="eleven_monolingual_v1"
-        )
+        # On a miss, pass the audio on as it arrives instead of waiting for all of it
+        streaming = stream_dialogue_audio(text, voice_id, output_format)
+        if streaming:
+            chunks, close = streaming
+            response = Response(chunks, mimetype=audio_formats.FORMATS[output_format]["mimetype"])
+            response.call_on_close(close)
+            # The admission slot stays taken until the last chunk has been sent
+            response.call_on_close(g.pop('release_admission'))
+            return response
+
+        # Cached, or built locally: serve the stored file
+        name = get_dialogue_audio(text, voice_id, output_format)
         
         logger.info("Audio generated successfully for streaming")
         
-        # Return audio data as streaming response
-        return app.response_class(
-            audio_data,
-            status=200,
-            mimetype='audio/mpeg'
+        response = send_file(
+            store.path(name),
+            mimetype=audio_formats.FORMATS[output_format]["mimetype"],
+            etag=name.split('.')[0]
         )
+        response.headers['Content-Location'] = audio_url(name)
+        return response
         
+    except BudgetExhausted as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        return busy_response(e)
     except Exception as e:
         logger.error(f"Error generating streaming dialogue audio: {str(e)}")
         return jsonify({
@@ -195,6 +519,7 @@ def generate_dialogue_audio_stream():
         }), 500
 
 @app.route('/generate-dialogue-audio-info', methods=['POST'])
+@admit
 def generate_dialogue_audio_info():
     """
     Generate dialogue audio and return metadata without the actual audio file
@@ -202,7 +527,8 @@ def generate_dialogue_audio_info():
     Expected JSON payload:
     {
         "text": "The dialogue text to convert to speech",
-        "voice_id": "voice_id_or_name" (optional, defaults to "default")
+        "voice_id": "voice_id_or_name" (optional, defaults to "default"),
+        "output_format": "mp3" (optional, defaults to "mp3")
     }
     
     Returns:
@@ -230,24 +556,31 @@ def generate_dialogue_audio_info():
         
         # Get voice ID
         voice_input = data.get('voice_id', 'default')
-        voice_id = AVAILABLE_VOICES.get(voice_input.lower(), voice_input)
+        try:
+            voice_id = catalog.resolve(voice_input)
+        except UnknownVoiceError as e:
+            return jsonify({
+                "error": str(e),
+                "available_voices": list(catalog.voices())
+            }), 400
         
-        logger.info(f"Generating audio info for text: {text[:50]}... with voice: {voice_id}")
+        # Get output format
+        output_format = data.get('output_format', audio_formats.DEFAULT_FORMAT).lower()
+        if output_format not in audio_formats.FORMATS:
+            return unsupported_format_response(output_format)
+
+        over_quota = charge_quota(len(text))
+        if over_quota:
+            return over_quota
         
-        # Initialize ElevenLabs client
-        client = elevenlabs.ElevenLabs(api_key=ELEVENLABS_API_KEY)
+        logger.info(f"Generating audio info for text: {text[:50]}... with voice: {voice_id}")
         
-        # Generate audio
-        audio_data = client.generate(
-            text=text,
-            voice=voice_id,
-            model="eleven_monolingual_v1"
-        )
+        # Generate audio (or reuse the cached result)
+        name = get_dialogue_audio(text, voice_id, output_format)
         
-        # Calculate audio duration (approximate)
-        # MP3 files are typically ~128kbps, so we can estimate duration
-        audio_size_bytes = len(audio_data)
-        estimated_duration_seconds = (audio_size_bytes * 8) / (128 * 1000)  # Rough estimate
+        # Calculate audio duration (approximate) from the format's bitrate
+        audio_size_bytes = os.path.getsize(store.path(name))
+        estimated_duration_seconds = audio_formats.estimate_duration(audio_size_bytes, output_format)
         
         logger.info("Audio generated successfully for info endpoint")
         
@@ -258,11 +591,15 @@ def generate_dialogue_audio_info():
             "voice_id": voice_id,
             "audio_size_bytes": audio_size_bytes,
             "estimated_duration_seconds": round(estimated_duration_seconds, 2),
-            "format": "mp3",
+            "format": output_format,
+            "audio_url": audio_url(name),
             "timestamp": datetime.now().isoformat(),
-            "message": "Audio generated successfully. Use the /generate-dialogue-audio endpoint to download the actual audio file."
+            "message": "Audio generated successfully. Fetch audio_url to download or play the actual audio file."
         })
         
+    except BudgetExhausted as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        return busy_response(e)
     except Exception as e:
         logger.error(f"Error generating dialogue audio info: {str(e)}")
         return jsonify({
@@ -270,6 +607,159 @@ def generate_dialogue_audio_info():
             "details": str(e)
         }), 500
 
+@app.route('/scenes', methods=['POST'])
+@admit
+def create_scene():
+    """
+    Render a whole scene written in the eleven.py screenplay format
+    
+    Expected JSON payload:
+    {
+        "script": "**RILEY**\\n\\"...Hey.\\"\\n\\n**JAMIE**\\n\\"...Riley?\\"",
+        "voices": {"RILEY": "rachel"} (optional, character -> voice name or ID),
+        "stream": false (optional; true returns the event stream in this response)
+    }
+    
+    Returns:
+    - 202 with the scene id and the URL of its event stream
+    - or, with "stream": true, the event stream itself
+    """
+    if not request.is_json:
+        return jsonify({
+            "error": "Content-Type must be application/json"
+        }), 400
+    
+    data = request.get_json()
+    
+    if not data or not str(data.get('script', '')).strip():
+        return jsonify({
+            "error": "Missing required field: 'script'"
+        }), 400
+    
+    entries = eleven.parse_scene(data['script'])
+    if not entries:
+        return jsonify({
+            "error": "No dialogue found in script"
+        }), 400
+    
+    # Resolve voice overrides before anything is synthesized
+    overrides = {k.strip().upper(): v for k, v in (data.get('voices') or {}).items()}
+    try:
+        for entry in entries:
+            override = overrides.get(entry["character"].upper())
+            if override:
+                entry["voice"] = catalog.resolve(override)
+    except UnknownVoiceError as e:
+        return jsonify({
+            "error": str(e),
+            "available_voices": list(catalog.voices())
+        }), 400
+    
+    missing = sorted({e["character"] for e in entries if not e["voice"]})
+    if missing:
+        return jsonify({
+            "error": "No voice for characters: " + ", ".join(missing),
+            "message": "Pass a voice for each of them in 'voices'"
+        }), 400
+    
+    # The clips are decoded and assembled in memory, so that memory comes out of the budget
+    reserved_bytes = scene_memory_bytes(entries)
+    if reserved_bytes > BUDGET.limit_bytes:
+        return jsonify({
+            "error": "Scene too long",
+            "message": "Split the script into shorter scenes"
+        }), 413
+    try:
+        BUDGET.acquire(reserved_bytes)
+    except BudgetExhausted as e:
+        logger.warning(f"Rejecting scene: {str(e)}")
+        return busy_response(e)
+    
+    # Only the spoken lines are synthesized, so only they count, as on the single-line endpoints
+    over_quota = charge_quota(sum(len(e["line"]) for e in entries))
+    if over_quota:
+        BUDGET.release(reserved_bytes)
+        return over_quota
+    
+    job = scenes.create()
+    threading.Thread(
+        target=copy_current_request_context(render_scene_job),
+        args=(job, entries, g.pop('release_admission', None), reserved_bytes),
+        daemon=True
+    ).start()
+    
+    logger.info(f"Scene {job.id} started: {len(entries)} lines")
+    if data.get('stream'):
+        # Same connection, so this also works when workers don't share scene jobs
+        return scene_event_response(job, request.args.get('format'))
+    
+    events_url = url_for('scene_events', scene_id=job.id)
+    response = jsonify({
+        "scene_id": job.id,
+        "lines": len(entries),
+        "events_url": events_url,
+        "message": "Scene rendering started. Follow events_url for clips as they are ready."
+    })
+    response.status_code = 202
+    response.headers['Location'] = events_url
+    return response
+
+@app.route('/scenes/<scene_id>/events', methods=['GET'])
+def scene_events(scene_id):
+    """
+    Stream a scene's progress
+    
+    Server-sent events by default (event types: clip, scene, error); pass ?format=ndjson
+    for one JSON object per line instead. SSE clients resume with Last-Event-ID.
+    """
+    job = scenes.get(scene_id)
+    if job is None:
+        return jsonify({
+            "error": "Scene not found"
+        }), 404
+    
+    # Resume after the last event the client saw; anything unparseable replays from the start
+    last_event_id = request.headers.get('Last-Event-ID', '').strip()
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    return scene_event_response(job, request.args.get('format'), start)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Memory budget, audio store, admission, upstream hedging and provider metrics for this worker process"""
+    return jsonify({
+        "memory_budget": BUDGET.metrics(),
+        "audio_store": store.metrics(),
+        "admission": {name: controller.metrics() for name, controller in admission.items()},
+        "quota": quota.metrics(),
+        "upstream": upstream.metrics(),
+        "providers": providers.metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/audio/<name>', methods=['GET'])
+def get_audio(name):
+    """
+    Serve previously generated audio by content hash
+    
+    The ETag is the content hash, so If-None-Match revalidation returns 304 and
+    Range requests (206) let players seek without downloading the whole clip.
+    """
+    if not AUDIO_NAME_PATTERN.match(name) or not os.path.exists(store.path(name)):
+        return jsonify({
+            "error": "Audio not found"
+        }), 404
+    
+    response = send_file(
+        store.path(name),
+        mimetype=audio_formats.MIMETYPES.get(name.rsplit('.', 1)[1], 'application/octet-stream'),
+        etag=name.split('.')[0],
+        conditional=True,
+        max_age=AUDIO_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -277,9 +767,13 @@ def not_found(error):
         "available_endpoints": [
             "GET /health",
             "GET /voices", 
+            "GET /metrics",
+            "POST /scenes",
+            "GET /scenes/<scene_id>/events",
             "POST /generate-dialogue-audio",
             "POST /generate-dialogue-audio-stream",
-            "POST /generate-dialogue-audio-info"
+            "POST /generate-dialogue-audio-info",
+            "GET /audio/<name>"
         ]
     }), 404
 
@@ -298,9 +792,14 @@ if __name__ == '__main__':
     print(f"📖 Available endpoints:")
     print(f"   GET  /health - Health check")
     print(f"   GET  /voices - List available voices")
+    print(f"   GET  /metrics - Budget, cache, admission and provider metrics")
     print(f"   POST /generate-dialogue-audio - Generate and download audio file")
     print(f"   POST /generate-dialogue-audio-stream - Stream audio data")
     print(f"   POST /generate-dialogue-audio-info - Get audio metadata")
+    print(f"   GET  /audio/<name> - Fetch generated audio (ETag, Range)")
+    print(f"   POST /scenes - Render a whole scene")
+    print(f"   GET  /scenes/<scene_id>/events - Stream a scene's clips as they render")
+    print(f"🔌 Providers: tts={providers.tts.names()} image={providers.image.names()} llm={providers.llm.names()}")
     print(f"\n🚀 Server starting...")
     
     app.run(
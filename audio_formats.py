@@ -0,0 +1,73 @@
+import subprocess
+import wave
+
+# Output formats the API can return.
+#   upstream: ElevenLabs output_format that yields these bytes natively (None = transcode locally)
+#   bitrate:  kbps, used to estimate duration from size
+PCM_RATE = 44100
+FORMATS = {
+    "mp3":     {"upstream": "mp3_44100_128", "ext": "mp3", "mimetype": "audio/mpeg", "bitrate": 128},
+    "mp3_64":  {"upstream": "mp3_44100_64", "ext": "mp3", "mimetype": "audio/mpeg", "bitrate": 64},
+    "mp3_96":  {"upstream": "mp3_44100_96", "ext": "mp3", "mimetype": "audio/mpeg", "bitrate": 96},
+    "mp3_128": {"upstream": "mp3_44100_128", "ext": "mp3", "mimetype": "audio/mpeg", "bitrate": 128},
+    "mp3_192": {"upstream": "mp3_44100_192", "ext": "mp3", "mimetype": "audio/mpeg", "bitrate": 192},
+    "opus":    {"upstream": "opus_48000_64", "ext": "opus", "mimetype": "audio/ogg; codecs=opus", "bitrate": 64},
+    "ogg":     {"upstream": "opus_48000_64", "ext": "ogg", "mimetype": "audio/ogg", "bitrate": 64},
+    "wav":     {"upstream": f"pcm_{PCM_RATE}", "ext": "wav", "mimetype": "audio/wav", "bitrate": PCM_RATE * 16 / 1000},
+    "pcm":     {"upstream": f"pcm_{PCM_RATE}", "ext": "pcm", "mimetype": f"audio/pcm; rate={PCM_RATE}; channels=1; encoding=s16le", "bitrate": PCM_RATE * 16 / 1000},
+    "flac":    {"upstream": None, "ext": "flac", "mimetype": "audio/flac", "bitrate": 400},
+}
+DEFAULT_FORMAT = "mp3"
+# Names for the same bytes as another format; they share its cache entries
+ALIASES = {"mp3_128": "mp3", "ogg": "opus"}
+MIMETYPES = {fmt["ext"]: fmt["mimetype"] for fmt in reversed(FORMATS.values())}
+
+# ffmpeg arguments used when a format has to be produced locally
+FFMPEG_ARGS = {
+    "mp3": ["-f", "mp3", "-b:a", "128k"],
+    "mp3_64": ["-f", "mp3", "-b:a", "64k"],
+    "mp3_96": ["-f", "mp3", "-b:a", "96k"],
+    "mp3_128": ["-f", "mp3", "-b:a", "128k"],
+    "mp3_192": ["-f", "mp3", "-b:a", "192k"],
+    "opus": ["-f", "ogg", "-c:a", "libopus", "-b:a", "64k"],
+    "ogg": ["-f", "ogg", "-c:a", "libopus", "-b:a", "64k"],
+    "wav": ["-f", "wav", "-ac", "1", "-ar", str(PCM_RATE)],
+    "pcm": ["-f", "s16le", "-ac", "1", "-ar", str(PCM_RATE)],
+    "flac": ["-f", "flac"],
+}
+
+CHUNK_SIZE = 64 * 1024
+
+def write_upstream(chunks, format_name, out):
+    """
+    Writes a native upstream response into out (a seekable file object).
+    WAV wraps the raw 16-bit mono PCM in a header; nothing is re-encoded.
+    """
+    if format_name != "wav":
+        for chunk in chunks:
+            out.write(chunk)
+        return
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(PCM_RATE)
+        for chunk in chunks:
+            wav.writeframesraw(chunk)
+
+def transcode(source_path, format_name, out):
+    """Transcodes an audio file into format_name with ffmpeg, streaming the result into out."""
+    cmd = ["ffmpeg", "-v", "error", "-i", source_path] + FFMPEG_ARGS[format_name] + ["-"]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        for chunk in iter(lambda: proc.stdout.read(CHUNK_SIZE), b""):
+            out.write(chunk)
+        stderr = proc.stderr.read()
+    if proc.returncode != 0:
+        raise RuntimeError(f"Transcoding to {format_name} failed: {stderr.decode(errors='replace')}")
+
+def estimate_size(text, format_name, chars_per_second=15):
+    """Rough encoded size of speaking text aloud, for reserving memory before generating it."""
+    return int(len(text) / chars_per_second * FORMATS[format_name]["bitrate"] * 1000 / 8)
+
+def estimate_duration(size_bytes, format_name):
+    """Approximate duration in seconds from the encoded size."""
+    return (size_bytes * 8) / (FORMATS[format_name]["bitrate"] * 1000)
@@ -0,0 +1,122 @@
+import numpy as np
+from pydub import AudioSegment
+
+# Post-processing defaults for dialogue clips
+TARGET_DBFS = -20.0              # RMS loudness every clip is normalized to
+SILENCE_THRESHOLD_DBFS = -45.0   # frames quieter than this count as silence
+FRAME_MS = 10
+KEEP_MS = 40                     # margin left around speech so consonants aren't clipped
+MAX_GAIN_DB = 20.0
+PEAK_CEILING = 0.98
+
+def segments_to_samples(segments):
+    """
+    Decodes segments back to back into one float32 array of shape (samples, channels), with
+    no padding. Returns it with each clip's offset and length in samples. All clips are
+    converted to the first clip's sample rate and channel count.
+    """
+    frame_rate = segments[0].frame_rate
+    channels = segments[0].channels
+    arrays = []
+    for segment in segments:
+        segment = segment.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(2)
+        arrays.append(np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, channels))
+
+    lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    samples = np.empty((lengths.sum(), channels), dtype=np.float32)
+    for offset, array in zip(offsets, arrays):
+        samples[offset:offset + len(array)] = array
+    samples /= 32768.0
+    return samples, offsets, lengths, frame_rate
+
+def array_to_segment(samples, frame_rate):
+    """Encodes a float (samples, channels) array back into a 16-bit AudioSegment."""
+    pcm = np.clip(samples * 32768.0, -32768, 32767).astype(np.int16)
+    return AudioSegment(
+        data=pcm.tobytes(),
+        sample_width=2,
+        frame_rate=frame_rate,
+        channels=samples.shape[1]
+    )
+
+def range_reduce(ufunc, values, start, end):
+    """
+    ufunc.reduceat over values[start[i]:end[i]] for every i, in one call. Ranges must be
+    non-empty, in order and not overlapping.
+    """
+    bounds = np.stack([start, end], axis=1).ravel()
+    # An index equal to len(values) is out of range; reducing from the last start already
+    # runs to the end of the array
+    if len(bounds) and bounds[-1] == len(values):
+        bounds = bounds[:-1]
+    return ufunc.reduceat(values, bounds)[::2]
+
+def speech_bounds(power, offsets, lengths, frame_rate, threshold_dbfs=SILENCE_THRESHOLD_DBFS,
+                  frame_ms=FRAME_MS, keep_ms=KEEP_MS):
+    """
+    Returns per-clip (start, end) sample indices of the non-silent region, relative to each
+    clip. power is the squared mono signal of all clips back to back.
+    """
+    frame_len = max(1, frame_rate * frame_ms // 1000)
+    n_frames = -(-lengths // frame_len)
+    start = np.zeros_like(lengths)
+    end = lengths.copy()
+    voiced = np.flatnonzero(lengths)
+    if not len(voiced):
+        return start, end
+
+    # Start of every frame of every clip in the concatenated signal; a clip's last frame may
+    # be short, but is averaged over a full frame as if padded with silence
+    frame_offsets = np.concatenate([[0], np.cumsum(n_frames)[:-1]])
+    local = np.arange(n_frames.sum()) - np.repeat(frame_offsets, n_frames)
+    frame_starts = np.repeat(offsets, n_frames) + local * frame_len
+    energy = np.sqrt(np.add.reduceat(power, frame_starts) / frame_len)
+    active = energy > 10 ** (threshold_dbfs / 20)
+
+    first_frames = frame_offsets[voiced]
+    has_sound = np.add.reduceat(active, first_frames) > 0
+    first = np.minimum.reduceat(np.where(active, local, n_frames.max()), first_frames)
+    last = np.maximum.reduceat(np.where(active, local, -1), first_frames)
+
+    keep = frame_rate * keep_ms // 1000
+    trimmed_start = np.maximum(first * frame_len - keep, 0)
+    trimmed_end = np.minimum((last + 1) * frame_len + keep, lengths[voiced])
+    start[voiced] = np.where(has_sound, trimmed_start, 0)
+    end[voiced] = np.where(has_sound, trimmed_end, lengths[voiced])
+    return start, end
+
+def normalization_gains(samples, power, offsets, start, end, target_dbfs=TARGET_DBFS, max_gain_db=MAX_GAIN_DB):
+    """
+    Returns the linear gain that brings each clip's speech region to target_dbfs RMS.
+    Mean power and peak are taken over the trimmed range only, in float32.
+    """
+    gain = np.ones(len(offsets), dtype=np.float32)
+    voiced = np.flatnonzero(end > start)
+    if not len(voiced):
+        return gain
+    lo, hi = offsets[voiced] + start[voiced], offsets[voiced] + end[voiced]
+
+    mean_power = range_reduce(np.add, power, lo, hi) / (hi - lo).astype(np.float32)
+    rms = np.sqrt(mean_power)
+    level = 10 ** (target_dbfs / 20) / np.maximum(rms, 1e-9)
+    level = np.minimum(level, 10 ** (max_gain_db / 20))
+
+    # Never push a clip's peak past the ceiling
+    peak = range_reduce(np.maximum, np.abs(samples).max(axis=1), lo, hi)
+    gain[voiced] = np.minimum(level, PEAK_CEILING / np.maximum(peak, 1e-9))
+    return gain
+
+def process_segments(segments, target_dbfs=TARGET_DBFS, threshold_dbfs=SILENCE_THRESHOLD_DBFS):
+    """Trims leading/trailing silence and loudness-normalizes a scene's clips in one batch."""
+    if not segments:
+        return []
+    samples, offsets, lengths, frame_rate = segments_to_samples(segments)
+    mono = samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1)
+    power = np.square(mono)
+    start, end = speech_bounds(power, offsets, lengths, frame_rate, threshold_dbfs)
+    gains = normalization_gains(samples, power, offsets, start, end, target_dbfs)
+    return [
+        array_to_segment(samples[offsets[i] + start[i]:offsets[i] + end[i]] * gains[i], frame_rate)
+        for i in range(len(segments))
+    ]
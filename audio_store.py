@@ -0,0 +1,177 @@
+import contextlib
+import fcntl
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+# Where generated audio lives; shared by every request the API serves (and by every
+# worker process pointed at the same directory)
+STORE_DIR = os.environ.get("AUDIO_STORE_DIR", os.path.join(tempfile.gettempdir(), "ai_movie_audio"))
+CHUNK_SIZE = 64 * 1024
+HOT_INDEX_SLOTS = 8192
+
+def request_key(**fields):
+    """Hash of everything that determines the generated bytes (text, voice, model, format...)."""
+    material = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class HotIndex:
+    """
+    Fixed-size key -> object table in a memory-mapped file, shared by all processes using
+    the store. A hit saves opening the key file; a miss or collision just falls back to disk.
+
+    Each slot holds the key prefix, the object's raw sha256, its extension and a crc32, so
+    a slot torn by a concurrent writer reads as a miss instead of a wrong answer.
+    """
+
+    RECORD = struct.Struct("16s32s8sI")
+
+    def __init__(self, path, slots=HOT_INDEX_SLOTS):
+        self.slots = slots
+        size = slots * self.RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def _offset(self, key):
+        return (int(key[:12], 16) % self.slots) * self.RECORD.size
+
+    def get(self, key):
+        offset = self._offset(key)
+        key_bytes, digest, ext, crc = self.RECORD.unpack_from(self._map, offset)
+        if key_bytes != bytes.fromhex(key[:32]) or crc != zlib.crc32(key_bytes + digest + ext):
+            return None
+        return digest.hex() + "." + ext.rstrip(b"\0").decode()
+
+    def put(self, key, name):
+        digest, ext = name.split(".", 1)
+        key_bytes = bytes.fromhex(key[:32])
+        record = (key_bytes, bytes.fromhex(digest), ext.encode()[:8])
+        crc = zlib.crc32(record[0] + record[1] + record[2].ljust(8, b"\0"))
+        self.RECORD.pack_into(self._map, self._offset(key), *record, crc)
+
+class AudioStore:
+    """
+    Content-addressed audio cache on local disk, safe to share between worker processes.
+
+    objects/<sha256>.<ext> holds the audio itself and keys/<request key> names the object a
+    request produced, so the same request is only ever generated once. Files are written
+    to a temporary name and renamed into place, generation of a key is serialized across
+    processes with lock(), and hot keys are mirrored in a shared memory-mapped index.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.keys_dir = os.path.join(root, "keys")
+        for path in (self.objects_dir, self.keys_dir):
+            os.makedirs(path, exist_ok=True)
+        self.hot = HotIndex(os.path.join(root, "hot.idx"))
+        self._stats_lock = threading.Lock()
+        self.stats = {"hot_hits": 0, "disk_hits": 0, "misses": 0, "lock_waits": 0, "lock_wait_seconds": 0.0}
+
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    def path(self, name):
+        return os.path.join(self.objects_dir, name)
+
+    def lookup(self, key):
+        """Returns the object name stored for a request key, or None."""
+        name = self.hot.get(key)
+        if name and os.path.exists(self.path(name)):
+            self._count("hot_hits")
+            return name
+        try:
+            with open(os.path.join(self.keys_dir, key), "r") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        # An empty key file is a lock() placeholder for audio that is still being generated
+        if not name or not os.path.exists(self.path(name)):
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self.hot.put(key, name)
+        return name
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """
+        Exclusive lock on a key across threads and processes. Take it after a lookup miss
+        and look up again inside, so only one worker generates any given key.
+
+        The lock is an flock on the key file itself (created empty if needed), so locking
+        costs no extra files. put_file() renames the finished key file over it; a worker
+        still waiting on the old file then finds the result when it looks up again.
+        """
+        path = os.path.join(self.keys_dir, key)
+        with open(path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                started = time.perf_counter()
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._count("lock_waits")
+                self._count("lock_wait_seconds", time.perf_counter() - started)
+            try:
+                yield
+            finally:
+                # Don't leave an empty placeholder behind when generation failed
+                with contextlib.suppress(OSError):
+                    if os.fstat(f.fileno()).st_size == 0 and os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                        os.unlink(path)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def put(self, key, data, ext):
+        """Stores data under its content hash, records it for key and returns the object name."""
+        return self.put_file(key, io.BytesIO(data), ext)
+
+    def put_file(self, key, fileobj, ext):
+        """Like put, but copies from a file object in chunks instead of holding it in memory."""
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+            name = f"{digest.hexdigest()}.{ext}"
+            os.replace(tmp_path, self.path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._write_atomic(os.path.join(self.keys_dir, key), name.encode())
+        self.hot.put(key, name)
+        return name
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["lock_wait_seconds"] = round(stats["lock_wait_seconds"], 3)
+        stats["pid"] = os.getpid()
+        return stats
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
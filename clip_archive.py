@@ -0,0 +1,372 @@
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+PACK_MAGIC = b"CLIPPAK1"
+INDEX_MAGIC = b"CLIPIDX1"
+HEADER = struct.Struct("8s16s")        # magic, generation (shared by a pack and its index)
+RECORD = struct.Struct("<QQ32sHI")     # offset, length, key, name length, crc32 (+ name bytes)
+DELETED = 2 ** 64 - 1                  # length of a tombstone record
+
+class ArchiveError(Exception):
+    """Raised when an archive is missing a clip or its files don't belong together."""
+
+class ClipArchive:
+    """
+    Many small clips packed into one append-only data file plus an offset index.
+
+    <path>.pack holds the clip bytes back to back and is read through mmap, so get() and
+    write_concat() hand out slices of the mapping without copying. <path>.idx is a log of
+    (name, offset, length, key) records; the last record for a name wins and tombstones
+    remove it. Clips with the same key share their bytes. Space held by replaced or removed
+    clips is reclaimed by compact().
+
+    Writers serialize on a lock file, so several processes can append to one archive.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.pack_path = f"{self.path}.pack"
+        self.index_path = f"{self.path}.idx"
+        self.lock_path = f"{self.path}.lock"
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_file = open(self.lock_path, "a")
+        self._map = None
+        self._pack = None
+        self._index = None
+        with self._file_lock(fcntl.LOCK_EX):
+            self._recover()
+            self._open()
+
+    # --- file handling --------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _file_lock(self, mode):
+        with self._lock:
+            fcntl.flock(self._lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _recover(self):
+        """Creates a new archive, or finishes or rolls back a compaction that was interrupted."""
+        if not os.path.exists(self.pack_path):
+            generation = uuid.uuid4().bytes
+            for path, magic in ((self.index_path, INDEX_MAGIC), (self.pack_path, PACK_MAGIC)):
+                with open(path, "wb") as f:
+                    f.write(HEADER.pack(magic, generation))
+            return
+        index_tmp = f"{self.index_path}.compact"
+        if os.path.exists(index_tmp):
+            with open(self.pack_path, "rb") as pack, open(index_tmp, "rb") as index:
+                swapped = pack.read(HEADER.size)[8:] == index.read(HEADER.size)[8:]
+            if swapped:
+                # The new pack is in place but the index wasn't swapped yet; it is complete
+                os.replace(index_tmp, self.index_path)
+            else:
+                os.unlink(index_tmp)
+        if os.path.exists(f"{self.pack_path}.compact"):
+            os.unlink(f"{self.pack_path}.compact")
+
+    def _open(self):
+        if self._pack:
+            self._pack.close()
+            self._index.close()
+        self._pack = open(self.pack_path, "rb")
+        self._index = open(self.index_path, "r+b")
+        pack_magic, pack_generation = HEADER.unpack(self._pack.read(HEADER.size))
+        index_magic, index_generation = HEADER.unpack(self._index.read(HEADER.size))
+        if pack_magic != PACK_MAGIC or index_magic != INDEX_MAGIC:
+            raise ArchiveError(f"{self.path} is not a clip archive")
+        if pack_generation != index_generation:
+            raise ArchiveError(f"{self.index_path} does not belong to {self.pack_path}")
+        self._index_inode = os.fstat(self._index.fileno()).st_ino
+        self._index_pos = HEADER.size
+        self._entries = {}     # name -> (offset, length, key)
+        self._by_key = {}      # key -> (offset, length)
+        self._map = None       # views handed out earlier keep the old mapping alive
+        self._mapped = 0
+        self._read_index()
+
+    def _read_index(self):
+        self._index.seek(self._index_pos)
+        data = self._index.read()
+        pos = 0
+        while pos + RECORD.size <= len(data):
+            offset, length, key, name_length, crc = RECORD.unpack_from(data, pos)
+            end = pos + RECORD.size + name_length
+            if end > len(data):
+                break
+            name_bytes = data[pos + RECORD.size:end]
+            if crc != zlib.crc32(data[pos:pos + RECORD.size - 4] + name_bytes):
+                break  # torn tail from a writer that died; the next writer truncates it
+            name = name_bytes.decode("utf-8")
+            if length == DELETED:
+                self._entries.pop(name, None)
+            else:
+                self._entries[name] = (offset, length, key)
+                self._by_key[key] = (offset, length)
+            pos = end
+        self._index_pos += pos
+
+    def _refresh(self, locked=False):
+        """Picks up clips appended by other processes, or a compacted archive."""
+        try:
+            inode = os.stat(self.index_path).st_ino
+        except FileNotFoundError:
+            inode = None
+        if inode != self._index_inode:
+            if locked:
+                self._open()
+            else:
+                with self._file_lock(fcntl.LOCK_SH):
+                    self._open()
+        else:
+            self._read_index()
+
+    def _view(self, offset, length):
+        if offset + length > self._mapped:
+            size = os.fstat(self._pack.fileno()).st_size
+            self._map = mmap.mmap(self._pack.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped = size
+        return memoryview(self._map)[offset:offset + length]
+
+    # --- reading --------------------------------------------------------------
+
+    def __contains__(self, name):
+        with self._lock:
+            self._refresh()
+            return name in self._entries
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    def names(self):
+        """Clip names in the order they were first added."""
+        with self._lock:
+            self._refresh()
+            return list(self._entries)
+
+    def key(self, name):
+        """The key stored with a clip (hex), or None if there is no such clip."""
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(name)
+            return entry[2].hex() if entry else None
+
+    def get(self, name):
+        """Returns the clip's bytes as a read-only memoryview into the archive."""
+        with self._lock:
+            # Always catch up: another process may have replaced or removed the clip
+            self._refresh()
+            if name not in self._entries:
+                raise ArchiveError(f"No clip named '{name}' in {self.path}")
+            offset, length, _ = self._entries[name]
+            return self._view(offset, length)
+
+    def write_concat(self, names, out):
+        """Writes the named clips back to back to a binary file object. Returns bytes written."""
+        views = [self.get(name) for name in names]
+        written = 0
+        for view in views:
+            out.write(view)
+            written += len(view)
+        return written
+
+    def export(self, name, path):
+        """Writes one clip out as a standalone file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.get(name))
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            live = sum(length for _, length in self._live_ranges())
+            size = os.fstat(self._pack.fileno()).st_size - HEADER.size
+            return {
+                "clips": len(self._entries),
+                "pack_bytes": size,
+                "live_bytes": live,
+                "dead_bytes": size - live
+            }
+
+    def _live_ranges(self):
+        return {(offset, length) for offset, length, _ in self._entries.values()}
+
+    # --- writing --------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _writing(self):
+        with self._file_lock(fcntl.LOCK_EX):
+            self._refresh(locked=True)
+            # Drop a torn record left by a writer that died mid-append
+            self._index.truncate(self._index_pos)
+            yield
+
+    def _append_record(self, name, offset, length, key):
+        name_bytes = name.encode("utf-8")
+        fields = RECORD.pack(offset, length, key, len(name_bytes), 0)[:RECORD.size - 4]
+        record = fields + struct.pack("<I", zlib.crc32(fields + name_bytes)) + name_bytes
+        self._index.seek(self._index_pos)
+        self._index.write(record)
+        self._index.flush()
+        self._read_index()
+
+    @staticmethod
+    def _key_bytes(key, data=None):
+        if key is None:
+            return hashlib.sha256(data).digest()
+        return bytes.fromhex(key) if isinstance(key, str) else key
+
+    def add(self, name, data, key=None):
+        """
+        Stores data under name, replacing any clip of that name. key (hex or 32 bytes)
+        identifies the content and defaults to its sha256; a key already in the archive
+        reuses the stored bytes instead of appending them again.
+        """
+        key = self._key_bytes(key, data)
+        with self._writing():
+            if key in self._by_key:
+                offset, length = self._by_key[key]
+            else:
+                with open(self.pack_path, "ab") as pack:
+                    offset = pack.tell()
+                    pack.write(data)
+                length = len(data)
+            if self._entries.get(name) != (offset, length, key):
+                self._append_record(name, offset, length, key)
+
+    def add_file(self, name, path, key=None):
+        """Imports a clip from a standalone file."""
+        with open(path, "rb") as f:
+            self.add(name, f.read(), key)
+
+    def link(self, name, key):
+        """Points name at the bytes already stored under key. Returns False if key is unknown."""
+        key = self._key_bytes(key)
+        with self._writing():
+            if key not in self._by_key:
+                return False
+            offset, length = self._by_key[key]
+            if self._entries.get(name) != (offset, length, key):
+                self._append_record(name, offset, length, key)
+            return True
+
+    def has_key(self, key):
+        with self._lock:
+            key = self._key_bytes(key)
+            if key not in self._by_key:
+                self._refresh()
+            return key in self._by_key
+
+    def remove(self, name):
+        with self._writing():
+            if name in self._entries:
+                self._append_record(name, 0, DELETED, bytes(32))
+
+    def compact(self):
+        """
+        Rewrites the archive with only the clips that are still named, in their current
+        order, and drops replaced records from the index. Returns the bytes reclaimed.
+        """
+        with self._writing():
+            before = os.fstat(self._pack.fileno()).st_size
+            generation = uuid.uuid4().bytes
+            moved = {}
+            pack_tmp = f"{self.pack_path}.compact"
+            index_tmp = f"{self.index_path}.compact"
+            with open(pack_tmp, "wb") as pack:
+                pack.write(HEADER.pack(PACK_MAGIC, generation))
+                for offset, length, _ in self._entries.values():
+                    if (offset, length) not in moved:
+                        moved[(offset, length)] = pack.tell()
+                        pack.write(self._view(offset, length))
+                after = pack.tell()
+                pack.flush()
+                os.fsync(pack.fileno())
+            with open(index_tmp, "wb") as index:
+                index.write(HEADER.pack(INDEX_MAGIC, generation))
+                for name, (offset, length, key) in self._entries.items():
+                    name_bytes = name.encode("utf-8")
+                    fields = RECORD.pack(moved[(offset, length)], length, key, len(name_bytes), 0)[:RECORD.size - 4]
+                    index.write(fields + struct.pack("<I", zlib.crc32(fields + name_bytes)) + name_bytes)
+                index.flush()
+                os.fsync(index.fileno())
+            # Pack first, index last: _recover() completes the swap if we die in between
+            os.replace(pack_tmp, self.pack_path)
+            os.replace(index_tmp, self.index_path)
+            self._open()
+        return before - after
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            self._pack.close()
+            self._index.close()
+            self._lock_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and maintain a packed clip archive.")
+    parser.add_argument("archive", help="Archive path without extension, e.g. voice_clips")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List clips with their sizes")
+    import_cmd = commands.add_parser("import", help="Add standalone files (named by their basename)")
+    import_cmd.add_argument("files", nargs="+")
+    export_cmd = commands.add_parser("export", help="Write clips out as standalone files")
+    export_cmd.add_argument("directory")
+    export_cmd.add_argument("names", nargs="*", help="Clips to export (default: all)")
+    concat_cmd = commands.add_parser("concat", help="Join clips into one file")
+    concat_cmd.add_argument("output")
+    concat_cmd.add_argument("names", nargs="*", help="Clips in order (default: all)")
+    remove_cmd = commands.add_parser("remove", help="Remove clips")
+    remove_cmd.add_argument("names", nargs="+")
+    commands.add_parser("compact", help="Reclaim space held by removed or replaced clips")
+    args = parser.parse_args()
+
+    with ClipArchive(args.archive) as archive:
+        if args.command == "list":
+            for name in archive.names():
+                print(f"{len(archive.get(name)):>10}  {name}")
+            stats = archive.stats()
+            print(f"📦 {stats['clips']} clips, {stats['live_bytes']} bytes live, {stats['dead_bytes']} bytes reclaimable")
+        elif args.command == "import":
+            for path in args.files:
+                archive.add_file(os.path.basename(path), path)
+            print(f"✅ Imported {len(args.files)} clips into {archive.pack_path}")
+        elif args.command == "export":
+            os.makedirs(args.directory, exist_ok=True)
+            names = args.names or archive.names()
+            for name in names:
+                archive.export(name, os.path.join(args.directory, name))
+            print(f"✅ Exported {len(names)} clips to {args.directory}")
+        elif args.command == "concat":
+            with open(args.output, "wb") as out:
+                written = archive.write_concat(args.names or archive.names(), out)
+            print(f"✅ Wrote {written} bytes to {args.output}")
+        elif args.command == "remove":
+            for name in args.names:
+                archive.remove(name)
+            print(f"✅ Removed {len(args.names)} clips")
+        elif args.command == "compact":
+            print(f"✅ Reclaimed {archive.compact()} bytes")
@@ -1,65 +1,112 @@
-import re
-import os
+import json
+import hashlib
 from pathlib import Path
 
-# ElevenLabs TTS
-import requests
+import eleven
+import providers
+from clip_archive import ClipArchive
+# Character name to voice mapping lives in the shared catalog
+from voices import catalog
 
-# Your ElevenLabs API Key
-ELEVENLABS_API_KEY = os.environ["ELEVENLABS_API_KEY"]
-
-# Voice mapping: character name to ElevenLabs voice ID
-CHARACTER_VOICES = {
-    "RILEY": "21m00Tcm4TlvDq8ikWAM",  # Example: Rachel
-    "JAMIE": "29vD33N1CtxCmqQRPOHJ"# Add more characters here
+MODEL_ID = "eleven_monolingual_v1"
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75
 }
+MANIFEST_FILE = "manifest.json"
 
 def parse_dialogue(script_text):
-    """Extracts character lines from script markdown."""
-    pattern = re.compile(r"\*\*(.+?)\*\*:\s*“(.+?)”")
-    lines = pattern.findall(script_text)
-    return lines  # List of tuples: (character, line)
+    """
+    Extracts (character, line) tuples from script markdown in the screenplay format
+    eleven.parse_scene reads: a **NAME** cue followed by the quoted line.
+    """
+    return [(entry["character"], entry["line"].strip('"“”').strip()) for entry in eleven.parse_scene(script_text)]
+
+def generate_voice(text, voice_id):
+    """
+    Voices a line with the configured TTS provider and returns (name of the backend that
+    answered, mp3 bytes), or None on failure.
+    """
+    try:
+        backend, chunks = providers.tts.synthesize(text, voice_id, model_id=MODEL_ID, voice_settings=VOICE_SETTINGS)
+        return backend, b"".join(chunks)
+    except Exception as e:
+        print("[!] Error:", e)
+        return None
 
-def generate_voice(text, output_filename, voice_id):
-    """Sends line to ElevenLabs and saves output to mp3."""
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY,
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "text": text,
-        "model_id": "eleven_monolingual_v1",
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.75
-        }
-    }
-    response = requests.post(url, headers=headers, json=payload)
+def line_key(character, text, voice_id, backend=None):
+    """
+    Content hash identifying a clip: same character, text, voice, settings and TTS backend
+    means same audio. backend defaults to the one the next call would go to.
+    """
+    material = json.dumps(
+        [character.upper(), text, voice_id, MODEL_ID, VOICE_SETTINGS] + list(providers.tts.cache_fields(backend).values()),
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
-    if response.status_code == 200:
-        with open(output_filename, "wb") as f:
-            f.write(response.content)
-        print(f"[✓] Audio saved: {output_filename}")
-    else:
-        print("[!] Error:", response.status_code, response.text)
+def import_clip_directory(clip_dir, archive):
+    """One-off migration of a voice_clips/ directory (clips + manifest.json) into the archive."""
+    path = Path(clip_dir) / MANIFEST_FILE
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        clips = json.load(f).get("clips", {})
+    for name, key in clips.items():
+        if (Path(clip_dir) / name).exists() and name not in archive:
+            archive.add_file(name, Path(clip_dir) / name, key)
+    print(f"[✓] Imported {len(clips)} clips from {clip_dir} into {archive.pack_path}")
 
-def process_script(script_path, output_dir):
-    print("""Main parser + audio generator.""")
+def process_script(script_path, archive_path):
+    """
+    Main parser + audio generator. Clips go into a packed ClipArchive at archive_path
+    (archive_path.pack / .idx) as <character>_line<N>.mp3.
+
+    Only lines whose (character, text, voice, settings) hash is not already in the archive
+    are sent to ElevenLabs; unchanged and repeated lines point at the bytes stored earlier.
+    """
     with open(script_path, "r", encoding="utf-8") as f:
         script_text = f.read()
 
-    os.makedirs(output_dir, exist_ok=True)
-
-    lines = parse_dialogue(script_text)
+    archive = ClipArchive(archive_path)
+    if not len(archive) and Path(archive_path).is_dir():
+        import_clip_directory(archive_path, archive)
 
-    for idx, (character, text) in enumerate(lines):
-        voice_id = CHARACTER_VOICES.get(character.upper())
-        if voice_id:
-            output_file = Path(output_dir) / f"{character.lower()}_line{idx+1}.mp3"
-            generate_voice(text, str(output_file), voice_id)
-        else:
+    wanted = []
+    for idx, (character, text) in enumerate(parse_dialogue(script_text)):
+        voice_id = catalog.character_voice(character)
+        if not voice_id:
             print(f"[!] No voice assigned for character: {character}")
+            continue
+        wanted.append((character, f"{character.lower()}_line{idx+1}.mp3", text, voice_id))
+
+    synthesized = 0
+    for character, name, text, voice_id in wanted:
+        key = line_key(character, text, voice_id)
+        if archive.key(name) == key or archive.link(name, key):
+            continue
+        voiced = generate_voice(text, voice_id)
+        if voiced is None:
+            archive.remove(name)
+            continue
+        # Keyed by the backend that answered: a failover draft must not pass for the real voice
+        backend, audio = voiced
+        archive.add(name, audio, line_key(character, text, voice_id, backend))
+        synthesized += 1
+        print(f"[✓] Audio saved: {name}")
+
+    # Clips of lines that are no longer in the script
+    names = {name for _, name, _, _ in wanted}
+    for name in archive.names():
+        if name not in names:
+            archive.remove(name)
+
+    stats = archive.stats()
+    print(f"[✓] {len(wanted)} lines, {synthesized} synthesized, {len(wanted) - synthesized} reused")
+    if stats["dead_bytes"] > stats["live_bytes"]:
+        archive.compact()
+    archive.close()
 
-# Example usage
-process_script("script.md", "voice_clips")
\ No newline at end of file
+if __name__ == "__main__":
+    # Example usage
+    process_script("script.md", "voice_clips")
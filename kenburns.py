@@ -0,0 +1,185 @@
+import argparse
+import subprocess
+import time
+
+import numpy as np
+from PIL import Image
+
+import mixer
+
+# Output video
+WIDTH = 1280
+HEIGHT = 720
+FPS = 25
+
+# Camera move over the scene image
+ZOOM_MIN = 1.0      # widest framing (whole image width/height covers the frame)
+ZOOM_MAX = 1.2      # tightest framing
+PAN = 0.6           # fraction of the free travel used for panning (0 = centered, 1 = edge to edge)
+
+def audio_duration(path):
+    """Length of an audio file in seconds, measured by decoding it with ffmpeg."""
+    proc = mixer.open_decoder(path)
+    total = 0
+    for chunk in iter(lambda: proc.stdout.read(1 << 20), b""):
+        total += len(chunk)
+    proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"Could not decode {path} (ffmpeg exit code {proc.returncode})")
+    return total / (mixer.SAMPLE_RATE * mixer.CHANNELS * 2)
+
+def load_image(path, width=WIDTH, height=HEIGHT, zoom_max=ZOOM_MAX):
+    """
+    Loads the scene image as float32 RGB, scaled so that at zoom_max one source pixel maps
+    to one output pixel and the image still covers the whole frame at zoom 1.
+    """
+    image = Image.open(path).convert("RGB")
+    scale = max(width * zoom_max / image.width, height * zoom_max / image.height)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    image = image.resize(size, Image.LANCZOS)
+    return np.asarray(image, dtype=np.float32)
+
+def smoothstep(t):
+    return t * t * (3 - 2 * t)
+
+class KenBurns:
+    """
+    Renders pan/zoom frames over one image into a reused buffer.
+
+    The camera move is an axis-aligned affine map (scale + translate), so bilinear sampling
+    separates into a vertical pass over the needed rows and a horizontal pass over the
+    needed columns. Both passes gather with np.take into buffers allocated once, and
+    frame() returns the same uint8 array every call.
+    """
+
+    def __init__(self, image, width=WIDTH, height=HEIGHT, zoom=(ZOOM_MIN, ZOOM_MAX),
+                 pan_from=(-PAN, -PAN), pan_to=(PAN, PAN), zoom_max=ZOOM_MAX):
+        self.image = image
+        self.width = width
+        self.height = height
+        self.zoom_start, self.zoom_end = zoom
+        self.pan_from = pan_from
+        self.pan_to = pan_to
+        self.zoom_max = zoom_max
+        src_h, src_w = image.shape[:2]
+        # Output pixel centres relative to the frame centre, in output pixels
+        self._u = np.arange(width, dtype=np.float32) - (width - 1) / 2
+        self._v = np.arange(height, dtype=np.float32) - (height - 1) / 2
+        self._rows_a = np.empty((height, src_w, 3), dtype=np.float32)
+        self._rows_b = np.empty((height, src_w, 3), dtype=np.float32)
+        self._cols_a = np.empty((height, width, 3), dtype=np.float32)
+        self._cols_b = np.empty((height, width, 3), dtype=np.float32)
+        self.buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+    def transform(self, t):
+        """Source pixels per output pixel and the view centre (x, y) at progress t in [0, 1]."""
+        src_h, src_w = self.image.shape[:2]
+        eased = smoothstep(t)
+        zoom = self.zoom_start + (self.zoom_end - self.zoom_start) * eased
+        scale = self.zoom_max / zoom
+        # Free travel of the view centre once the view itself fits inside the image
+        free_x = max(0.0, src_w - self.width * scale) / 2
+        free_y = max(0.0, src_h - self.height * scale) / 2
+        pan_x = self.pan_from[0] + (self.pan_to[0] - self.pan_from[0]) * eased
+        pan_y = self.pan_from[1] + (self.pan_to[1] - self.pan_from[1]) * eased
+        return scale, ((src_w - 1) / 2 + pan_x * free_x, (src_h - 1) / 2 + pan_y * free_y)
+
+    def frame(self, t):
+        scale, (cx, cy) = self.transform(t)
+        src_h, src_w = self.image.shape[:2]
+
+        # Vertical pass: blend the two source rows around every output row
+        ys = np.clip(cy + self._v * scale, 0, src_h - 1)
+        y0 = ys.astype(np.intp)
+        fy = (ys - y0)[:, None, None]
+        y1 = np.minimum(y0 + 1, src_h - 1)
+
+        xs = np.clip(cx + self._u * scale, 0, src_w - 1)
+        x0 = xs.astype(np.intp)
+        fx = (xs - x0)[None, :, None]
+        x1 = np.minimum(x0 + 1, src_w - 1)
+
+        # Only the columns inside the view take part, so work on that slice of the image
+        left, right = x0[0], x1[-1] + 1
+        region = self.image[:, left:right]
+        rows_a = self._rows_a[:, :right - left]
+        rows_b = self._rows_b[:, :right - left]
+        np.take(region, y0, axis=0, out=rows_a, mode="clip")
+        np.take(region, y1, axis=0, out=rows_b, mode="clip")
+        rows_b -= rows_a
+        rows_b *= fy
+        rows_a += rows_b
+
+        # Horizontal pass
+        np.take(rows_a, x0 - left, axis=1, out=self._cols_a, mode="clip")
+        np.take(rows_a, x1 - left, axis=1, out=self._cols_b, mode="clip")
+        self._cols_b -= self._cols_a
+        self._cols_b *= fx
+        self._cols_a += self._cols_b
+        self._cols_a += 0.5
+        np.copyto(self.buffer, self._cols_a, casting="unsafe")
+        return self.buffer
+
+def open_video_encoder(output_path, audio_path, width=WIDTH, height=HEIGHT, fps=FPS):
+    """Starts ffmpeg encoding raw RGB frames from stdin, muxed with audio_path, into output_path."""
+    cmd = [
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest",
+        output_path
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+def render_ken_burns(image_path, audio_path, output_path, width=WIDTH, height=HEIGHT, fps=FPS, seed=None):
+    """
+    Animates a slow pan/zoom over image_path for the length of audio_path and encodes both
+    into output_path. Frames go straight from the sampling buffer into ffmpeg's stdin.
+    seed picks the direction of the move, so consecutive scenes can move differently.
+    """
+    duration = audio_duration(audio_path)
+    n_frames = max(1, round(duration * fps))
+
+    rng = np.random.default_rng(seed)
+    direction = rng.choice([-1.0, 1.0], size=2)
+    zoom = (ZOOM_MIN, ZOOM_MAX) if rng.random() < 0.5 else (ZOOM_MAX, ZOOM_MIN)
+    camera = KenBurns(
+        load_image(image_path, width, height), width, height, zoom=zoom,
+        pan_from=tuple(-PAN * direction), pan_to=tuple(PAN * direction)
+    )
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    encoder = open_video_encoder(output_path, audio_path, width, height, fps)
+    try:
+        for i in range(n_frames):
+            frame = camera.frame(i / max(1, n_frames - 1))
+            encoder.stdin.write(frame.data)
+    finally:
+        encoder.stdin.close()
+        encoder.wait()
+
+    if encoder.returncode != 0:
+        raise RuntimeError(f"Encoding the video failed (ffmpeg exit code {encoder.returncode})")
+
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    print(f"✅ Video saved to {output_path} ({n_frames} frames, {duration:.1f}s at {fps} fps)")
+    print(f"   {n_frames / max(elapsed, 1e-9):.1f} frames/s end to end, "
+          f"{n_frames / max(cpu, 1e-9):.1f} frames/s per core for frame rendering")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Animate a pan/zoom over a scene image for the length of its audio.")
+    parser.add_argument("image")
+    parser.add_argument("audio")
+    parser.add_argument("output")
+    parser.add_argument("--size", default=f"{WIDTH}x{HEIGHT}", help="Output size, e.g. 1920x1080")
+    parser.add_argument("--fps", type=int, default=FPS)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    render_ken_burns(args.image, args.audio, args.output, width, height, args.fps)
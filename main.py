@@ -1,47 +1,47 @@
-import elevenlabs
-import openai
-import requests
 import re
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
-ELEVENLABS_API_KEY = os.environ["ELEVENLABS_API_KEY"]
-# Placeholder for image/video and music API keys
-STABILITY_AI_API_KEY = os.environ["STABILITY_AI_API_KEY"]
-SUNO_AI_API_KEY = os.environ["SUNO_AI_API_KEY"]
+from pydub import AudioSegment
+
+import eleven
+import kenburns
+import mixer
+import providers
+from script_stream import ScriptStreamParser
+from voices import catalog
+
+# Script, image and speech API keys are read by providers.py; without them the local
+# offline providers are used. Placeholder for the music API key:
+SUNO_AI_API_KEY = os.environ.get("SUNO_AI_API_KEY")
+
+# --- Step 1: Script Generation (OpenAI, or the local draft writer) ---
+SCRIPT_SYSTEM_PROMPT = "You are a professional screenwriter. Write a very short, single-scene script with one character and a clear scene description. Include dialogue and scene descriptions."
 
-# --- Step 1: Script Generation using OpenAI ---
 def generate_script(storyline):
     """Generates a simple script from a storyline."""
     print("🎬 Generating script...")
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a professional screenwriter. Write a very short, single-scene script with one character and a clear scene description. Include dialogue and scene descriptions."},
-            {"role": "user", "content": f"Storyline: {storyline}"}
-        ]
-    )
-    script = response.choices[0].message.content
+    script = providers.llm.complete(SCRIPT_SYSTEM_PROMPT, f"Storyline: {storyline}")
     print("✅ Script generated:\n", script)
     return script
 
+def generate_script_stream(storyline):
+    """Like generate_script, but yields the script text as the model produces it."""
+    print("🎬 Generating script (streaming)...")
+    yield from providers.llm.stream(SCRIPT_SYSTEM_PROMPT, f"Storyline: {storyline}")
+
 def extract_visual_description_and_dialogue(script):
     """Extract visual description and dialogue from the generated script."""
     print("🔍 Extracting visual description and dialogue from script...")
     
-    # Ask OpenAI to extract the key elements
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "Extract from the script: 1) A detailed visual description for image generation (max 100 words), 2) The main dialogue text (max 200 words). Return in format: VISUAL: [description] DIALOGUE: [dialogue]"},
-            {"role": "user", "content": f"Script: {script}"}
-        ]
+    # Ask the language model to extract the key elements
+    extracted = providers.llm.complete(
+        "Extract from the script: 1) A detailed visual description for image generation (max 100 words), 2) The main dialogue text (max 200 words). Return in format: VISUAL: [description] DIALOGUE: [dialogue]",
+        f"Script: {script}"
     )
     
-    extracted = response.choices[0].message.content
-    
     # Parse the response
     visual_match = re.search(r'VISUAL:\s*(.*?)(?=DIALOGUE:|$)', extracted, re.DOTALL)
     dialogue_match = re.search(r'DIALOGUE:\s*(.*?)(?=VISUAL:|$)', extracted, re.DOTALL)
@@ -55,67 +55,29 @@ def extract_visual_description_and_dialogue(script):
     return visual_description, dialogue_text
 
 # --- Step 2: Visual Asset Generation ---
-def generate_image_from_text(description):
-    """Generate an image from text using Stability AI's API."""
+def generate_image_from_text(description, image_path="scene_image.png"):
+    """Generate an image from text with the configured image provider."""
     print("🖼️ Generating image from description...")
-
-    # Load API key from environment variable
-    api_key = STABILITY_AI_API_KEY
-    if not api_key:
-        raise ValueError("Missing STABILITY_AI_API_KEY environment variable.")
-
-    # API endpoint and headers
-    url = "https://api.stability.ai/v2beta/stable-image/generate/core"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Accept": "image/png"
-    }
-
-    payload = {
-        "prompt": description
-    }
-
-    # Send request
-    response = requests.post(url, headers=headers, json=payload)
-
-    # Check for errors
-    if response.status_code != 200:
-        raise RuntimeError(f"Image generation failed: {response.text}")
-
-    # Save image
-    image_path = "scene_image.png"
-    with open(image_path, "wb") as f:
-        f.write(response.content)
-
+    providers.image.generate_image(description, image_path)
     print(f"✅ Image saved to {image_path}")
     return image_path
 
-# --- Step 3: Dialogue Generation using ElevenLabs ---
-def generate_dialogue_audio(text, voice_id="21m00Tcm4TlvDq8ikWAM"):
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    output_filename = "eleven_audio.mp3"
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY,
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "text": text,
-        "model_id": "eleven_monolingual_v1",
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.75
-        }
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-
-    if response.status_code == 200:
+# --- Step 3: Dialogue Generation (ElevenLabs, or the local synthesizer) ---
+def generate_dialogue_audio(text, voice_id="21m00Tcm4TlvDq8ikWAM", output_filename="eleven_audio.mp3"):
+    try:
+        _, chunks = providers.tts.synthesize(
+            text, voice_id,
+            model_id="eleven_monolingual_v1",
+            voice_settings={"stability": 0.5, "similarity_boost": 0.75}
+        )
         with open(output_filename, "wb") as f:
-            f.write(response.content)
-        print(f"Audio saved to {output_filename}")
-    else:
-        print("Error:", response.status_code, response.text)
+            for chunk in chunks:
+                f.write(chunk)
+    except Exception as e:
+        print("Error:", e)
+        return None
+    print(f"Audio saved to {output_filename}")
+    return output_filename
 
 # --- Step 4: Music Generation (Placeholder) ---
 def generate_music(mood):
@@ -154,6 +116,62 @@ def assemble_video_simple(image_path, dialogue_audio_path, music_audio_path=None
         print(f"❌ Error creating assembly instructions: {str(e)}")
         return None
 
+# --- Speculative pipeline: synthesis overlaps script generation ---
+def run_streaming_pipeline(storyline, clips_dir="streamed_lines", max_workers=4):
+    """
+    Streams the script from the LLM and starts work the moment each piece is complete:
+    the image as soon as the scene description is done, and TTS for every dialogue line
+    as soon as that line is done. End-to-end time approaches max(LLM, TTS) instead of
+    their sum.
+    """
+    print("🎬 Starting streaming pipeline...")
+    started = time.perf_counter()
+    os.makedirs(clips_dir, exist_ok=True)
+    parser = ScriptStreamParser()
+    default_voice = catalog.resolve("default")
+
+    image_future = None
+    lines = []  # (entry, future) in script order
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def dispatch(events):
+            nonlocal image_future
+            for event in events:
+                if event[0] == "scene" and image_future is None:
+                    print(f"🖼️ Scene description ready after {time.perf_counter() - started:.1f}s")
+                    image_future = executor.submit(generate_image_from_text, event[1])
+                elif event[0] == "line":
+                    _, character, text = event
+                    voice_id = catalog.character_voice(character) or default_voice
+                    output_filename = os.path.join(clips_dir, f"line_{len(lines) + 1:03d}.mp3")
+                    print(f"🎙 Dispatching {character}: {text[:50]}")
+                    future = executor.submit(generate_dialogue_audio, text, voice_id, output_filename)
+                    lines.append(({"character": character, "line": text}, future))
+
+        for chunk in generate_script_stream(storyline):
+            dispatch(parser.feed(chunk))
+        dispatch(parser.finish())
+        print(f"✅ Script finished streaming after {time.perf_counter() - started:.1f}s, "
+              f"{len(lines)} lines dispatched")
+
+        clip_paths = [(entry, future.result()) for entry, future in lines]
+        image_path = None
+        if image_future:
+            try:
+                image_path = image_future.result()
+            except Exception as e:
+                # The voiced lines are still worth keeping without an image
+                print(f"⚠ Image generation failed, continuing without an image: {e}")
+
+    voiced = [(entry, path) for entry, path in clip_paths if path]
+    dialogue = eleven.join_clips(
+        [entry for entry, _ in voiced],
+        [AudioSegment.from_mp3(path) for _, path in voiced]
+    )
+    dialogue_audio_path = "eleven_audio.mp3"
+    dialogue.export(dialogue_audio_path, format="mp3")
+    print(f"✅ Dialogue assembled from {len(voiced)} lines in {time.perf_counter() - started:.1f}s total")
+    return image_path, dialogue_audio_path
+
 # --- Main execution flow ---
 def main():
     """Main function to generate a complete movie from storyline."""
@@ -197,22 +215,38 @@ def main():
     """
     
     try:
-        # Step 1: Generate script
-        script = generate_script(storyline)
-        
-        # Step 2: Extract visual description and dialogue
-        visual_description, dialogue_text = extract_visual_description_and_dialogue(script)
-        
-        # Step 3: Generate image
-        # image_path = generate_image_from_text(visual_description)
-        
-        # Step 4: Generate dialogue audio
-        dialogue_audio_path = generate_dialogue_audio(dialogue_text)
+        if "--stream" in sys.argv:
+            # Steps 1-4 overlapped: TTS and image start while the script is still streaming
+            image_path, dialogue_audio_path = run_streaming_pipeline(storyline)
+        else:
+            # Step 1: Generate script
+            script = generate_script(storyline)
+            
+            # Step 2: Extract visual description and dialogue
+            visual_description, dialogue_text = extract_visual_description_and_dialogue(script)
+            
+            # Step 3: Generate image
+            # image_path = generate_image_from_text(visual_description)
+            
+            # Step 4: Generate dialogue audio
+            dialogue_audio_path = generate_dialogue_audio(dialogue_text)
+            image_path = "scene_image.png"
         
         # Step 5: Generate music (optional)
         music_audio_path = generate_music("Emotional and contemplative")
-        image_path = "scene_image.png"
-        # Step 6: Create assembly instructions
+        if dialogue_audio_path and os.path.exists(music_audio_path):
+            dialogue_audio_path = mixer.mix_dialogue_with_music(
+                dialogue_audio_path, music_audio_path, "scene_mix.mp3"
+            )
+        # Step 6: Animate the scene image over the audio, or fall back to assembly instructions
+        if image_path and dialogue_audio_path and os.path.exists(image_path):
+            video_path = kenburns.render_ken_burns(image_path, dialogue_audio_path, "scene_video.mp4")
+            print(f"🎉 Movie generation complete! Check the generated files:")
+            print(f"   - Image: {image_path}")
+            print(f"   - Audio: {dialogue_audio_path}")
+            print(f"   - Video: {video_path}")
+            return
+
         instructions_path = assemble_video_simple(image_path, dialogue_audio_path, music_audio_path)
         
         if instructions_path:
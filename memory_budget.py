@@ -0,0 +1,119 @@
+import os
+import tempfile
+import threading
+
+# Process-wide limits for audio/image payloads held in memory
+BUDGET_BYTES = int(float(os.environ.get("MEMORY_BUDGET_MB", 256)) * 1024 * 1024)
+SPILL_BYTES = int(float(os.environ.get("SPILL_THRESHOLD_MB", 8)) * 1024 * 1024)
+WAIT_SECONDS = float(os.environ.get("MEMORY_BUDGET_WAIT_SECONDS", 5))
+RETRY_AFTER_SECONDS = 2
+
+class BudgetExhausted(Exception):
+    """Raised when memory for a payload could not be reserved in time."""
+
+    def __init__(self, requested, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__(f"Memory budget exhausted (needed {requested} bytes)")
+        self.retry_after = retry_after
+
+class MemoryBudget:
+    """Counts bytes held in memory across threads; callers wait for room or give up."""
+
+    def __init__(self, limit_bytes=BUDGET_BYTES, wait_seconds=WAIT_SECONDS):
+        self.limit_bytes = limit_bytes
+        self.wait_seconds = wait_seconds
+        self._cond = threading.Condition()
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self.rejections = 0
+        self.spills = 0
+
+    def acquire(self, nbytes, timeout=None):
+        timeout = self.wait_seconds if timeout is None else timeout
+        with self._cond:
+            if self.in_use + nbytes > self.limit_bytes:
+                self.waits += 1
+                if not self._cond.wait_for(lambda: self.in_use + nbytes <= self.limit_bytes, timeout):
+                    self.rejections += 1
+                    raise BudgetExhausted(nbytes)
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+
+    def release(self, nbytes):
+        with self._cond:
+            self.in_use -= nbytes
+            self._cond.notify_all()
+
+    def record_spill(self):
+        with self._cond:
+            self.spills += 1
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "limit_bytes": self.limit_bytes,
+                "in_use_bytes": self.in_use,
+                "peak_bytes": self.peak,
+                "utilization": round(self.in_use / self.limit_bytes, 4),
+                "waits": self.waits,
+                "rejections": self.rejections,
+                "spills": self.spills
+            }
+
+# Shared by everything in this process
+BUDGET = MemoryBudget()
+
+class SpillBuffer:
+    """
+    Seekable write buffer whose in-memory bytes are charged to a MemoryBudget.
+
+    Once the payload grows past spill_bytes it moves to a temporary file and its
+    reservation is returned, so large payloads never count against the budget.
+    """
+
+    def __init__(self, expected_bytes=0, budget=BUDGET, spill_bytes=SPILL_BYTES):
+        self.budget = budget
+        self.spill_bytes = spill_bytes
+        self.spilled = False
+        # Reserving the expected size up front makes callers wait (or fail) before doing the work
+        self.reserved = min(expected_bytes, spill_bytes)
+        budget.acquire(self.reserved)
+        self._file = tempfile.SpooledTemporaryFile(max_size=spill_bytes)
+
+    def write(self, data):
+        if not self.spilled:
+            if self._file.tell() + len(data) > self.spill_bytes:
+                self._file.rollover()
+                self.spilled = True
+                self.budget.record_spill()
+                self.budget.release(self.reserved)
+                self.reserved = 0
+            else:
+                end = max(self._file.tell() + len(data), self.reserved)
+                if end > self.reserved:
+                    self.budget.acquire(end - self.reserved)
+                    self.reserved = end
+        return self._file.write(data)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        self.budget.release(self.reserved)
+        self.reserved = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,136 @@
+import argparse
+import subprocess
+import time
+
+import numpy as np
+
+# All mixing happens on 16-bit PCM at this rate and channel count
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK_SECONDS = 2.0
+
+# Ducking envelope
+FRAME_MS = 10                   # control rate of the gain envelope
+THRESHOLD_DBFS = -40.0          # dialogue louder than this ducks the music
+MUSIC_DB = -8.0                 # music bed level while nobody is speaking
+DUCK_DB = -14.0                 # additional attenuation under dialogue
+ATTACK_MS = 60
+RELEASE_MS = 500
+
+def open_decoder(path, loop=False):
+    """Starts ffmpeg decoding path to raw PCM on stdout."""
+    cmd = ["ffmpeg", "-v", "error"]
+    if loop:
+        cmd += ["-stream_loop", "-1"]
+    cmd += ["-i", path, "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "-"]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE)
+
+def open_encoder(path):
+    """Starts ffmpeg encoding raw PCM from stdin into path (format from the extension)."""
+    cmd = [
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "-i", "-",
+        path
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+def read_block(proc, n_samples):
+    """Reads up to n_samples frames from a decoder as float32 (samples, channels)."""
+    data = proc.stdout.read(n_samples * CHANNELS * 2)
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS)
+    return samples.astype(np.float32) / 32768.0
+
+class Ducker:
+    """Sidechain gain envelope for the music bed; smoothing state carries across blocks."""
+
+    def __init__(self, threshold_dbfs=THRESHOLD_DBFS, music_db=MUSIC_DB, duck_db=DUCK_DB,
+                 attack_ms=ATTACK_MS, release_ms=RELEASE_MS, frame_ms=FRAME_MS):
+        self.frame_len = SAMPLE_RATE * frame_ms // 1000
+        self.threshold = 10 ** (threshold_dbfs / 20)
+        self.music_db = music_db
+        self.duck_db = duck_db
+        self.attack = 1 - np.exp(-frame_ms / attack_ms)
+        self.release = 1 - np.exp(-frame_ms / release_ms)
+        self.gain_db = music_db
+
+    def envelope(self, dialogue):
+        """Returns the per-sample linear music gain for a block of dialogue."""
+        n = len(dialogue)
+        n_frames = -(-n // self.frame_len)
+        mono = np.zeros(n_frames * self.frame_len, dtype=np.float32)
+        mono[:n] = dialogue.mean(axis=1)
+        energy = np.sqrt(np.mean(mono.reshape(n_frames, self.frame_len) ** 2, axis=1))
+        target = np.where(energy > self.threshold, self.music_db + self.duck_db, self.music_db)
+
+        # One-pole smoothing at control rate: fast attack into the duck, slow release out of it
+        frame_db = np.empty(n_frames + 1)
+        frame_db[0] = current = self.gain_db
+        for i, t in enumerate(target, start=1):
+            current += (t - current) * (self.attack if t < current else self.release)
+            frame_db[i] = current
+        self.gain_db = current
+
+        # Interpolate the control points up to sample rate
+        points = np.arange(n_frames + 1) * self.frame_len
+        gain_db = np.interp(np.arange(1, n + 1), points, frame_db)
+        return (10 ** (gain_db / 20)).astype(np.float32)
+
+def mix_dialogue_with_music(dialogue_path, music_path, output_path, block_seconds=BLOCK_SECONDS,
+                            ducker=None):
+    """
+    Mixes a looping music bed under dialogue, ducking the music while anyone speaks.
+
+    Audio is processed in fixed-size blocks so memory stays flat however long the mix is.
+    The mix ends when the dialogue does.
+    """
+    print("🎚️ Mixing music under dialogue...")
+    ducker = ducker or Ducker()
+    block = int(SAMPLE_RATE * block_seconds)
+    started = time.perf_counter()
+
+    dialogue_proc = open_decoder(dialogue_path)
+    music_proc = open_decoder(music_path, loop=True)
+    encoder = open_encoder(output_path)
+    mixed_samples = 0
+    try:
+        while True:
+            dialogue = read_block(dialogue_proc, block)
+            if not len(dialogue):
+                break
+            music = read_block(music_proc, len(dialogue))
+            if len(music) < len(dialogue):
+                # The bed loops forever, so running out means the decoder failed
+                music_proc.wait()
+                raise RuntimeError(f"Could not decode {music_path} (ffmpeg exit code {music_proc.returncode})")
+
+            mix = dialogue + music * ducker.envelope(dialogue)[:, None]
+            pcm = np.clip(mix * 32768.0, -32768, 32767).astype(np.int16)
+            encoder.stdin.write(pcm.tobytes())
+            mixed_samples += len(dialogue)
+        if dialogue_proc.wait() != 0:
+            raise RuntimeError(f"Could not decode {dialogue_path} (ffmpeg exit code {dialogue_proc.returncode})")
+    finally:
+        for proc in (dialogue_proc, music_proc):
+            proc.kill()
+            proc.wait()
+        encoder.stdin.close()
+        encoder.wait()
+
+    if encoder.returncode != 0:
+        raise RuntimeError(f"Encoding the mix failed (ffmpeg exit code {encoder.returncode})")
+
+    elapsed = time.perf_counter() - started
+    duration = mixed_samples / SAMPLE_RATE
+    print(f"✅ Mix saved to {output_path} ({duration:.1f}s of audio in {elapsed:.1f}s, "
+          f"{duration / max(elapsed, 1e-9):.0f}x real time)")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mix a music bed under dialogue with automatic ducking.")
+    parser.add_argument("dialogue")
+    parser.add_argument("music")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    mix_dialogue_with_music(args.dialogue, args.music, args.output)
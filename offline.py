@@ -0,0 +1,212 @@
+import hashlib
+import re
+import subprocess
+import textwrap
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# --- Speech -----------------------------------------------------------------
+#
+# A small formant synthesizer: every letter becomes a short segment with a pitch, three
+# formant frequencies, a voiced level and a noise level. Those are expanded to per-sample
+# tracks, smoothed so segments glide into each other, and rendered as a sum of harmonics
+# weighted by the formant envelope plus shaped noise. Robotic, but fast and fully offline.
+
+VOWELS = {
+    "a": (730, 1090, 2440), "e": (530, 1840, 2480), "i": (270, 2290, 3010),
+    "o": (570, 840, 2410), "u": (300, 870, 2240), "y": (270, 2290, 3010),
+}
+VOICED_CONSONANTS = {
+    "m": (280, 1100, 2200), "n": (280, 1700, 2600), "l": (360, 1300, 2700),
+    "r": (420, 1300, 1600), "w": (300, 610, 2200), "v": (300, 1200, 2400),
+    "z": (300, 1700, 2600), "b": (300, 900, 2300), "d": (300, 1700, 2600),
+    "g": (300, 1900, 2500), "j": (280, 2100, 2900),
+}
+UNVOICED = {"s": 0.35, "f": 0.2, "h": 0.12, "t": 0.3, "k": 0.25, "p": 0.2, "c": 0.3, "x": 0.3, "q": 0.25}
+PAUSES = {" ": 0.06, ",": 0.2, ";": 0.25, ":": 0.25, ".": 0.35, "!": 0.35, "?": 0.35, "\n": 0.3}
+VOWEL_SECONDS = 0.085
+CONSONANT_SECONDS = 0.055
+FORMANT_WIDTHS = (90.0, 120.0, 160.0)
+FORMANT_GAINS = (1.0, 0.6, 0.25)
+HARMONICS_UP_TO_HZ = 4000
+
+def voice_params(voice_id):
+    """Pitch and formant scaling derived from the voice ID, so each voice sounds different."""
+    digest = hashlib.sha256(voice_id.encode("utf-8")).digest()
+    f0 = 90 + digest[0] / 255 * 130             # 90-220 Hz
+    formant_scale = 0.9 + digest[1] / 255 * 0.25
+    return f0, formant_scale
+
+def text_segments(text):
+    """(seconds, formants, voiced, noise, pitch_offset) for every letter, pause and phrase end."""
+    segments = []
+    for sentence in re.findall(r"[^.!?]+[.!?]*", text) or [text]:
+        rise = sentence.strip().endswith("?")
+        letters = [c for c in sentence.lower() if c.isalpha() or c in PAUSES]
+        for i, char in enumerate(letters):
+            progress = i / max(1, len(letters) - 1)
+            # Falling declination over the sentence, rising at the end of questions
+            pitch = 1.1 - 0.25 * progress + (0.45 * progress ** 4 if rise else 0)
+            if char in VOWELS:
+                segments.append((VOWEL_SECONDS, VOWELS[char], 1.0, 0.0, pitch))
+            elif char in VOICED_CONSONANTS:
+                segments.append((CONSONANT_SECONDS, VOICED_CONSONANTS[char], 0.45, 0.03, pitch))
+            elif char in UNVOICED:
+                segments.append((CONSONANT_SECONDS, (500, 1500, 2500), 0.0, UNVOICED[char], pitch))
+            elif char in PAUSES:
+                segments.append((PAUSES[char], (500, 1500, 2500), 0.0, 0.0, pitch))
+            elif char.isalpha():
+                segments.append((CONSONANT_SECONDS, (500, 1500, 2500), 0.3, 0.05, pitch))
+    return segments
+
+def smooth(track, window):
+    kernel = np.hanning(window) / np.hanning(window).sum()
+    return np.convolve(np.pad(track, (window // 2, window - window // 2 - 1), mode="edge"), kernel, mode="valid")
+
+def synthesize_speech(text, voice_id, sample_rate=44100):
+    """Speaks text with a voice derived from voice_id. Returns mono int16 samples."""
+    segments = text_segments(text) or [(0.2, (500, 1500, 2500), 0.0, 0.0, 1.0)]
+    f0, formant_scale = voice_params(voice_id)
+    lengths = np.array([max(1, int(seconds * sample_rate)) for seconds, *_ in segments])
+
+    def track(values):
+        return np.repeat(np.asarray(values, dtype=np.float32), lengths, axis=0)
+
+    window = int(0.02 * sample_rate)
+    pitch = smooth(track([s[4] for s in segments]) * f0, window)
+    voiced = smooth(track([s[2] for s in segments]), window)
+    noise_level = smooth(track([s[3] for s in segments]), window // 2)
+    formants = track([s[1] for s in segments]) * formant_scale
+    formants = np.stack([smooth(formants[:, i], window) for i in range(3)], axis=1)
+
+    # Harmonic part: sum of harmonics of the pitch, each weighted by the formant envelope
+    phase = np.cumsum(2 * np.pi * pitch / sample_rate)
+    out = np.zeros(len(pitch), dtype=np.float32)
+    for k in range(1, int(HARMONICS_UP_TO_HZ / pitch.min()) + 1):
+        freq = k * pitch
+        gain = np.zeros_like(out)
+        for i in range(3):
+            gain += FORMANT_GAINS[i] * np.exp(-0.5 * ((freq - formants[:, i]) / FORMANT_WIDTHS[i]) ** 2)
+        gain *= freq < sample_rate / 2
+        out += gain * np.sin(k * phase) / np.sqrt(k)
+    out *= voiced
+
+    # Noise part: white noise, high-passed by differencing for a fricative hiss
+    rng = np.random.default_rng(int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little"))
+    hiss = np.diff(rng.standard_normal(len(out) + 1).astype(np.float32))
+    out += hiss * noise_level
+
+    peak = np.abs(out).max()
+    if peak > 0:
+        out *= 0.7 / peak
+    return (out * 32767).astype(np.int16)
+
+def encode_speech(samples, upstream_format):
+    """
+    Encodes int16 samples into an ElevenLabs-style output format (pcm_44100, mp3_44100_128,
+    opus_48000_64...) and returns the bytes. Compressed formats go through ffmpeg.
+    """
+    codec, rate, *bitrate = upstream_format.split("_")
+    if codec == "pcm":
+        return samples.tobytes()
+    args = {"mp3": ["-f", "mp3"], "opus": ["-f", "ogg", "-c:a", "libopus"]}.get(codec)
+    if args is None:
+        raise ValueError(f"Unsupported output format: {upstream_format}")
+    if bitrate:
+        args += ["-b:a", f"{bitrate[0]}k"]
+    cmd = ["ffmpeg", "-v", "error", "-f", "s16le", "-ar", rate, "-ac", "1", "-i", "-"] + args + ["-"]
+    proc = subprocess.run(cmd, input=samples.tobytes(), capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Encoding to {upstream_format} failed: {proc.stderr.decode(errors='replace')}")
+    return proc.stdout
+
+def output_sample_rate(upstream_format):
+    return int(upstream_format.split("_")[1])
+
+# --- Images -----------------------------------------------------------------
+
+PALETTES = {
+    "night": ((10, 14, 40), (40, 40, 90), (15, 20, 30)),
+    "dark": ((25, 20, 30), (70, 50, 60), (20, 18, 22)),
+    "sunset": ((250, 140, 80), (120, 60, 110), (50, 35, 45)),
+    "bright": ((120, 190, 250), (220, 240, 255), (70, 140, 60)),
+    "default": ((90, 130, 180), (200, 210, 220), (60, 80, 70)),
+}
+KEYWORDS = {
+    "night": "night", "moon": "night", "stars": "night", "dark": "dark", "dim": "dark",
+    "underground": "dark", "tunnel": "dark", "sunset": "sunset", "dusk": "sunset",
+    "evening": "sunset", "bright": "bright", "sunny": "bright", "field": "bright", "day": "bright",
+}
+
+def placeholder_image(prompt, width=768, height=512):
+    """
+    Procedural draft image for a prompt: a sky gradient and layered hills whose palette
+    follows keywords in the prompt, with the prompt itself printed along the bottom.
+    The same prompt always draws the same picture.
+    """
+    words = re.findall(r"[a-z]+", prompt.lower())
+    palette = PALETTES[next((KEYWORDS[w] for w in words if w in KEYWORDS), "default")]
+    rng = np.random.default_rng(int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "little"))
+    sky_top, sky_bottom, ground = (np.array(c, dtype=np.float32) for c in palette)
+
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    pixels = np.broadcast_to(sky_top + (sky_bottom - sky_top) * y, (height, width, 3)).copy()
+
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    rows = np.arange(height, dtype=np.float32)[:, None]
+    for layer in range(3):
+        depth = (layer + 1) / 3
+        ridge = 0.45 + 0.15 * depth
+        for _ in range(3):
+            ridge = ridge + rng.uniform(0.02, 0.08) * np.sin(2 * np.pi * (rng.uniform(0.5, 3) * x + rng.uniform()))
+        mask = rows > ridge[None, :] * height
+        color = ground * (0.5 + 0.5 * depth) + sky_bottom * (1 - depth) * 0.3
+        pixels[mask] = color
+
+    pixels += rng.normal(0, 4, pixels.shape).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    draw = ImageDraw.Draw(image)
+    caption = "\n".join(textwrap.wrap(f"DRAFT: {prompt}", width=max(20, width // 8))[:3])
+    draw.multiline_text((12, height - 16 * caption.count("\n") - 28), caption, fill=(255, 255, 255))
+    return image
+
+# --- Scripts ----------------------------------------------------------------
+
+DIALOGUE_LINE = re.compile(r"^\s*([A-Z][A-Za-z .'\-]{0,30}):\s*(?:\((.*?)\)\s*)?[\"“](.+?)[\"”]\s*$", re.MULTILINE)
+
+def split_storyline(storyline):
+    """(narration paragraphs, [(character, parenthetical, line)]) from a storyline."""
+    dialogue = DIALOGUE_LINE.findall(storyline)
+    narration = [
+        " ".join(p.split()) for p in re.split(r"\n\s*\n", DIALOGUE_LINE.sub("", storyline))
+        if p.strip()
+    ]
+    return narration, dialogue
+
+def draft_script(storyline):
+    """Turns a storyline into a screenplay in the format the parsers read, without a model."""
+    narration, dialogue = split_storyline(storyline)
+    parts = ["EXT. SCENE - DAY", "", narration[0] if narration else "A quiet place.", ""]
+    if not dialogue:
+        dialogue = [("NARRATOR", "", sentence.strip()) for sentence in re.findall(r"[^.!?]+[.!?]", " ".join(narration))[:6]]
+    for character, parenthetical, line in dialogue:
+        parts.append(f"**{character.upper()}**")
+        if parenthetical:
+            parts.append(f"*({parenthetical})*")
+        parts.extend([f"\"{line.strip()}\"", ""])
+    for paragraph in narration[1:]:
+        parts.extend([f"*{paragraph}*", ""])
+    return "\n".join(parts)
+
+def draft_extraction(script):
+    """Answers the VISUAL/DIALOGUE extraction prompt from a script, without a model."""
+    description = []
+    for line in script.splitlines():
+        stripped = line.strip().strip("*")
+        if stripped and not stripped.isupper() and not stripped.startswith(('"', "(")):
+            description.append(stripped)
+    dialogue = re.findall(r"[\"“](.+?)[\"”]", script)
+    visual = " ".join(" ".join(description).split()[:100]) or "A dramatic scene with characters"
+    return f"VISUAL: {visual}\nDIALOGUE: {' '.join(dialogue)[:1200]}"
@@ -0,0 +1,341 @@
+import logging
+import os
+import threading
+import time
+
+import elevenlabs
+import openai
+import requests
+from PIL import Image
+
+import offline
+import upstream
+from memory_budget import SpillBuffer
+
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_API_KEY = os.environ.get("ELEVENLABS_API_KEY")
+STABILITY_API_KEY = os.environ.get("STABILITY_AI_API_KEY")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+
+# Backends to route between, in order of preference. The local offline backend is only used
+# when every hosted backend listed with it is unavailable or failing, unless it is listed
+# alone. Without an API key a kind falls back to local, so drafts and load tests run with no
+# network access at all.
+TTS_PROVIDERS = os.environ.get("TTS_PROVIDERS", "elevenlabs" if ELEVENLABS_API_KEY else "local")
+IMAGE_PROVIDERS = os.environ.get("IMAGE_PROVIDERS", "stability" if STABILITY_API_KEY else "local")
+LLM_PROVIDERS = os.environ.get("LLM_PROVIDERS", "openai" if OPENAI_API_KEY else "local")
+
+# Routing
+DEFAULT_BACKENDS = {"tts": "elevenlabs", "image": "stability", "llm": "openai"}
+# Errors that are the request's fault, not the backend's: another backend would reject it too.
+# 403 is how ElevenLabs refuses an output format the plan doesn't include; api.py transcodes
+# around that.
+REQUEST_ERRORS = (400, 403, 404, 422)
+LATENCY_ALPHA = 0.2         # weight of the newest sample in the moving averages
+ERROR_THRESHOLD = float(os.environ.get("PROVIDER_ERROR_THRESHOLD", 0.5))
+COOLDOWN_SECONDS = float(os.environ.get("PROVIDER_COOLDOWN_SECONDS", 30))
+
+DEFAULT_MODEL_ID = "eleven_monolingual_v1"
+DEFAULT_FORMAT = "mp3_44100_128"
+
+# --- TTS backends -------------------------------------------------------------
+#
+# synthesize(text, voice_id, output_format, model_id, voice_settings) returns an iterable of
+# audio bytes in an ElevenLabs output format (mp3_44100_128, pcm_44100, opus_48000_64...).
+
+class ElevenLabsTTS:
+    name = "elevenlabs"
+    hosted = True
+
+    def available(self):
+        return bool(ELEVENLABS_API_KEY)
+
+    def synthesize(self, text, voice_id, output_format=DEFAULT_FORMAT, model_id=DEFAULT_MODEL_ID,
+                   voice_settings=None):
+        client = elevenlabs.ElevenLabs(api_key=ELEVENLABS_API_KEY)
+        settings = elevenlabs.VoiceSettings(**voice_settings) if voice_settings else None
+        # Returns once the first bytes have arrived; slow calls are hedged
+        return upstream.tts.call(
+            lambda: upstream.Prefetched(client.text_to_speech.convert(
+                voice_id,
+                text=text,
+                model_id=model_id,
+                output_format=output_format,
+                voice_settings=settings
+            )),
+            discard=upstream.Prefetched.close
+        )
+
+class LocalTTS:
+    """Formant synthesizer running on the CPU; see offline.synthesize_speech."""
+
+    name = "local"
+    hosted = False
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, voice_id, output_format=DEFAULT_FORMAT, model_id=None, voice_settings=None):
+        samples = offline.synthesize_speech(text, voice_id, offline.output_sample_rate(output_format))
+        return [offline.encode_speech(samples, output_format)]
+
+# --- Image backends -------------------------------------------------------------
+#
+# generate_image(prompt, output_path, width, height) writes an image file and returns its path.
+
+class StabilityImage:
+    name = "stability"
+    hosted = True
+
+    def available(self):
+        return bool(STABILITY_API_KEY)
+
+    def generate_image(self, prompt, output_path, width=768, height=512):
+        url = "https://api.stability.ai/v2beta/stable-image/generate/core"
+        headers = {
+            "Authorization": f"Bearer {STABILITY_API_KEY}",
+            "Accept": "image/png"
+        }
+        payload = {
+            "prompt": prompt,
+            "output_format": "png",
+            "width": width,
+            "height": height,
+            "mode": "text-to-image"
+        }
+
+        def post():
+            # Raise inside the attempt, so a fast error never beats a slower success in the
+            # hedging race and isn't recorded as a latency
+            response = requests.post(url, headers=headers, files={"none": ''}, data=payload, stream=True)
+            if response.status_code != 200:
+                error = requests.HTTPError(f"Image generation failed: {response.status_code} {response.text}")
+                error.status_code = response.status_code
+                response.close()
+                raise error
+            return response
+
+        response = upstream.image.call(post, discard=requests.Response.close)
+
+        # Buffer through the process memory budget; large images spill to disk
+        with SpillBuffer() as buffer:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                buffer.write(chunk)
+            buffer.seek(0)
+            Image.open(buffer).save(output_path)
+        return output_path
+
+class LocalImage:
+    """Procedural placeholder images; see offline.placeholder_image."""
+
+    name = "local"
+    hosted = False
+
+    def available(self):
+        return True
+
+    def generate_image(self, prompt, output_path, width=768, height=512):
+        offline.placeholder_image(prompt, width, height).save(output_path)
+        return output_path
+
+# --- LLM backends ---------------------------------------------------------------
+#
+# complete(system, user) returns the reply text; stream(system, user) yields it in pieces.
+
+class OpenAILLM:
+    name = "openai"
+    hosted = True
+    model = "gpt-4o"
+
+    def available(self):
+        return bool(OPENAI_API_KEY)
+
+    def _messages(self, system, user):
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+    def complete(self, system, user):
+        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        response = client.chat.completions.create(model=self.model, messages=self._messages(system, user))
+        return response.choices[0].message.content
+
+    def stream(self, system, user):
+        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        chunks = client.chat.completions.create(model=self.model, messages=self._messages(system, user), stream=True)
+        return upstream.Prefetched(
+            chunk.choices[0].delta.content
+            for chunk in chunks
+            if chunk.choices and chunk.choices[0].delta.content
+        )
+
+class LocalLLM:
+    """
+    Template "model" for offline runs. It recognizes the two prompts the pipeline sends:
+    extraction requests get VISUAL/DIALOGUE answers, everything else is treated as a
+    storyline to turn into a screenplay.
+    """
+
+    name = "local"
+    hosted = False
+
+    def available(self):
+        return True
+
+    def complete(self, system, user):
+        text = user.split(":", 1)[1] if ":" in user[:20] else user
+        if "VISUAL:" in system:
+            return offline.draft_extraction(text)
+        return offline.draft_script(text)
+
+    def stream(self, system, user):
+        reply = self.complete(system, user)
+        return (reply[i:i + 40] for i in range(0, len(reply), 40))
+
+BACKENDS = {
+    "tts": {"elevenlabs": ElevenLabsTTS, "local": LocalTTS},
+    "image": {"stability": StabilityImage, "local": LocalImage},
+    "llm": {"openai": OpenAILLM, "local": LocalLLM},
+}
+
+# --- Routing ------------------------------------------------------------------------
+
+class BackendStats:
+    def __init__(self):
+        self.latency = None     # moving average of successful call latency, seconds
+        self.error_rate = 0.0   # moving average of failures (0-1)
+        self.last_error_at = 0
+        self.calls = 0
+        self.errors = 0
+
+class Router:
+    """
+    Sends each call to the first healthy backend of one kind, failing over in order.
+
+    Hosted backends come first; latency only decides between several healthy hosted ones
+    (timed to their first bytes, so they are comparable), and one without a latency sample
+    yet is tried first so every backend gets measured. The local engine is the last resort:
+    it answers in milliseconds, but is a draft. Error rate is a moving average per backend;
+    a backend whose error rate is above ERROR_THRESHOLD goes to the back of the line for
+    COOLDOWN_SECONDS after its last failure, then is tried again. Errors about the request itself (REQUEST_ERRORS) are raised without
+    failing over and don't count against the backend; rate limits (429) and auth or billing
+    failures (401, 402) count as backend failures, since another backend may still answer.
+    """
+
+    def __init__(self, kind, names):
+        self.kind = kind
+        self.backends = []
+        for name in (n.strip() for n in names.split(",") if n.strip()):
+            if name not in BACKENDS[kind]:
+                raise ValueError(f"Unknown {kind} provider '{name}' (choose from {', '.join(BACKENDS[kind])})")
+            self.backends.append(BACKENDS[kind][name]())
+        self._lock = threading.Lock()
+        self._stats = {backend.name: BackendStats() for backend in self.backends}
+
+    def candidates(self):
+        now = time.time()
+        with self._lock:
+            hosted, local, cooling = [], [], []
+            for backend in self.backends:
+                if not backend.available():
+                    continue
+                stats = self._stats[backend.name]
+                if stats.error_rate > ERROR_THRESHOLD and now - stats.last_error_at < COOLDOWN_SECONDS:
+                    cooling.append(backend)
+                elif backend.hosted:
+                    hosted.append(backend)
+                else:
+                    local.append(backend)
+            hosted.sort(key=lambda b: self._stats[b.name].latency or 0.0)
+        # Backends cooling down are still tried when nothing else answers
+        return hosted + local + cooling
+
+    def _record(self, backend, latency=None, failed=False):
+        with self._lock:
+            stats = self._stats[backend.name]
+            stats.calls += 1
+            stats.error_rate += LATENCY_ALPHA * (float(failed) - stats.error_rate)
+            if failed:
+                stats.errors += 1
+                stats.last_error_at = time.time()
+            elif stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += LATENCY_ALPHA * (latency - stats.latency)
+
+    def call(self, method, *args, **kwargs):
+        """Returns (name of the backend that answered, its result)."""
+        candidates = self.candidates()
+        if not candidates:
+            raise RuntimeError(f"No {self.kind} provider available (configured: {self.names()})")
+        error = None
+        for backend in candidates:
+            started = time.perf_counter()
+            try:
+                result = getattr(backend, method)(*args, **kwargs)
+            except Exception as e:
+                if getattr(e, "status_code", None) in REQUEST_ERRORS:
+                    raise
+                self._record(backend, failed=True)
+                logger.warning(f"{self.kind} provider {backend.name} failed: {e}")
+                error = e
+                continue
+            self._record(backend, time.perf_counter() - started)
+            return backend.name, result
+        raise error
+
+    def preferred(self):
+        """Name of the backend the next call would go to first."""
+        candidates = self.candidates()
+        return candidates[0].name if candidates else self.names()
+
+    def names(self):
+        return ",".join(backend.name for backend in self.backends)
+
+    def cache_fields(self, backend=None):
+        """
+        Extra cache-key fields naming the backend that produced a result, so audio from
+        different providers is never mixed up. Store results under the backend call()
+        reported; look them up with backend=None, which names the backend the next call
+        would go to. Empty for the default backend, which keeps existing caches valid.
+        """
+        if backend is None:
+            backend = self.preferred()
+        return {} if backend == DEFAULT_BACKENDS[self.kind] else {"provider": backend}
+
+    def metrics(self):
+        with self._lock:
+            return {
+                backend.name: {
+                    "available": backend.available(),
+                    "avg_latency_seconds": round(stats.latency, 3) if stats.latency is not None else None,
+                    "error_rate": round(stats.error_rate, 3),
+                    "calls": stats.calls,
+                    "errors": stats.errors
+                }
+                for backend, stats in ((b, self._stats[b.name]) for b in self.backends)
+            }
+
+class TTSRouter(Router):
+    def synthesize(self, text, voice_id, output_format=DEFAULT_FORMAT, model_id=DEFAULT_MODEL_ID,
+                   voice_settings=None):
+        """Returns (backend name, iterable of audio bytes); the name belongs in cache keys."""
+        return self.call("synthesize", text, voice_id, output_format, model_id, voice_settings)
+
+class ImageRouter(Router):
+    def generate_image(self, prompt, output_path, width=768, height=512):
+        return self.call("generate_image", prompt, output_path, width, height)[1]
+
+class LLMRouter(Router):
+    def complete(self, system, user):
+        return self.call("complete", system, user)[1]
+
+    def stream(self, system, user):
+        return self.call("stream", system, user)[1]
+
+# Shared by every module in this process
+tts = TTSRouter("tts", TTS_PROVIDERS)
+image = ImageRouter("image", IMAGE_PROVIDERS)
+llm = LLMRouter("llm", LLM_PROVIDERS)
+
+def metrics():
+    return {router.kind: router.metrics() for router in (tts, image, llm)}
@@ -0,0 +1,144 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import eleven
+import kenburns
+import mixer
+import stability
+from script_stream import SCENE_HEADING
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+def iter_scenes(script_path):
+    """
+    Yields the script one scene at a time so the whole file is never held in memory. A scene
+    starts at a slugline such as EXT. LAKESIDE PARK - DAY, plain or in bold.
+    """
+    scene = []
+    with open(script_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if SCENE_HEADING.match(line) and "".join(scene).strip():
+                yield "".join(scene)
+                scene = []
+            scene.append(line)
+    if "".join(scene).strip():
+        yield "".join(scene)
+
+def describe_scene(scene_text, max_words=100):
+    """Builds an image prompt from the scene's prose, leaving out the dialogue."""
+    prose = re.sub(eleven.DIALOGUE_PATTERN, " ", scene_text, flags=re.DOTALL)
+    prose = re.sub(r"[\*_#]+", "", prose)
+    words = prose.split()
+    return " ".join(words[:max_words]) or "A dramatic scene with characters"
+
+def write_json_atomic(path, data):
+    """Writes JSON next to its destination and renames it into place."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(output_dir):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {"completed": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def render_scene(scene_text, scene_dir, with_image=True, music_path=None, with_video=False, seed=None):
+    """Renders one scene's audio, image, optional pan/zoom video and manifest into scene_dir."""
+    if with_video and not with_image:
+        raise ValueError("The pan/zoom video is rendered over the scene image, so it needs images")
+    os.makedirs(scene_dir, exist_ok=True)
+
+    timeline = []
+    scene_audio = eleven.assemble_scene(eleven.parse_scene(scene_text), timeline)
+    audio_path = os.path.join(scene_dir, "audio.mp3")
+    scene_audio.export(f"{audio_path}.tmp", format="mp3")
+    os.replace(f"{audio_path}.tmp", audio_path)
+
+    mix_path = None
+    if music_path:
+        mix_path = os.path.join(scene_dir, "mix.mp3")
+        mixer.mix_dialogue_with_music(audio_path, music_path, mix_path)
+
+    image_path = None
+    description = describe_scene(scene_text)
+    if with_image:
+        image_path = os.path.join(scene_dir, "image.png")
+        stability.generate_scene_image(description, image_path)
+        if not os.path.exists(image_path):
+            raise RuntimeError(f"Image generation failed for {scene_dir}")
+
+    video_path = None
+    if with_video:
+        video_path = os.path.join(scene_dir, "video.mp4")
+        kenburns.render_ken_burns(image_path, mix_path or audio_path, video_path, seed=seed)
+
+    manifest = {
+        "audio": os.path.basename(audio_path),
+        "mix": os.path.basename(mix_path) if mix_path else None,
+        "image": os.path.basename(image_path) if image_path else None,
+        "video": os.path.basename(video_path) if video_path else None,
+        "description": description,
+        "duration_ms": len(scene_audio),
+        "lines": timeline
+    }
+    write_json_atomic(os.path.join(scene_dir, "manifest.json"), manifest)
+    return manifest
+
+def render_script(script_path, output_dir, with_image=True, music_path=None, with_video=False):
+    """
+    Renders a multi-scene script scene by scene.
+
+    Each finished scene is recorded in the checkpoint along with the options it was rendered
+    with, so a restart skips every scene whose text and options are unchanged and picks up at
+    the first incomplete one. Re-running with e.g. --video renders the scenes again.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = load_checkpoint(output_dir)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+
+    rendered = skipped = 0
+    for idx, scene_text in enumerate(iter_scenes(script_path), start=1):
+        scene_id = f"scene_{idx:03d}"
+        entry = {
+            "hash": hashlib.sha1(scene_text.encode("utf-8")).hexdigest(),
+            "with_image": with_image,
+            "music_path": music_path,
+            "with_video": with_video
+        }
+        scene_dir = os.path.join(output_dir, scene_id)
+
+        if (checkpoint["completed"].get(scene_id) == entry
+                and os.path.exists(os.path.join(scene_dir, "manifest.json"))):
+            skipped += 1
+            continue
+
+        print(f"🎬 Rendering {scene_id}...")
+        render_scene(scene_text, scene_dir, with_image, music_path, with_video, seed=idx)
+        checkpoint["completed"][scene_id] = entry
+        write_json_atomic(checkpoint_path, checkpoint)
+        rendered += 1
+        print(f"✅ {scene_id} saved to {scene_dir}")
+
+    print(f"🎉 Render complete: {rendered} rendered, {skipped} already done")
+    return checkpoint
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a multi-scene script with per-scene checkpoints.")
+    parser.add_argument("script", nargs="?", default="script.md")
+    parser.add_argument("output_dir", nargs="?", default="render_output")
+    parser.add_argument("--no-images", action="store_true", help="Skip scene image generation")
+    parser.add_argument("--music", help="Music bed to mix under each scene's dialogue")
+    parser.add_argument("--video", action="store_true", help="Also render a pan/zoom video.mp4 per scene")
+    args = parser.parse_args()
+    if args.video and args.no_images:
+        parser.error("--video pans over the scene image, so it cannot be combined with --no-images")
+
+    render_script(args.script, args.output_dir, with_image=not args.no_images, music_path=args.music,
+                  with_video=args.video)
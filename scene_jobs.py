@@ -0,0 +1,64 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+MAX_JOBS = 100          # finished jobs beyond this are forgotten, oldest first
+HEARTBEAT_SECONDS = 15
+
+class SceneJob:
+    """Ordered event log of one scene render that any number of listeners can follow."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.events = []
+        self.done = False
+        self._cond = threading.Condition()
+
+    def emit(self, event_type, **data):
+        with self._cond:
+            self.events.append({"type": event_type, **data})
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def iter_events(self, start=0, heartbeat_seconds=HEARTBEAT_SECONDS):
+        """
+        Yields (index, event) from start onwards as events arrive, until the job is done.
+        Yields None when nothing happened for heartbeat_seconds, so callers can keep the
+        connection alive.
+        """
+        index = start
+        while True:
+            with self._cond:
+                if index >= len(self.events) and not self.done:
+                    self._cond.wait(heartbeat_seconds)
+                pending = self.events[index:]
+                finished = self.done
+            if not pending:
+                if finished:
+                    return
+                yield None
+            for event in pending:
+                yield index, event
+                index += 1
+
+class SceneRegistry:
+    def __init__(self, max_jobs=MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self):
+        job = SceneJob()
+        with self._lock:
+            self._jobs[job.id] = job
+            for job_id in [j for j, old in self._jobs.items() if old.done][:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[job_id]
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,111 @@
+import re
+
+# Lines that belong to the scene heading / transitions rather than to anyone's dialogue
+SLUGLINE = re.compile(r"^\W*(INT|EXT|EST|I/E|FADE|CUT TO|DISSOLVE)\b")
+# A scene heading, plain or wrapped in markdown: EXT. PARK - DAY, **INT. HOUSE - NIGHT**, ### I/E CAR
+SCENE_HEADING = re.compile(r"^\W*(?:INT|EXT|EST|I/E)[.\s/]")
+# A character cue on its own line: **JAMIE**, JAMIE (V.O.), **RILEY** *(softly)*
+CUE = re.compile(r"^\**\s*([A-Z][A-Z0-9 .'\-]{0,30}?)\s*\**\s*(?:\*?\(.*?\)\*?)?\s*:?\s*$")
+# Cue and line together: **RILEY**: "Hey." / Riley: "Hey."
+INLINE = re.compile(r"^\**\s*([A-Za-z][A-Za-z0-9 .'\-]{0,30}?)\s*\**\s*(?:\(.*?\))?\s*\**:\s*\**\s*(.+)$")
+PARENTHETICAL = re.compile(r"^\*?\(.*\)\*?$")
+ITALIC_ACTION = re.compile(r"^\*[^*].*[^*]\*$")
+
+def clean_text(text):
+    """Strips markdown, parentheticals and surrounding quotes from a script fragment."""
+    text = re.sub(r"\(.*?\)", "", text)
+    text = re.sub(r"[\*_]+", "", text)
+    return text.strip().strip('"“”').strip()
+
+class ScriptStreamParser:
+    """
+    Parses a screenplay incrementally while it is still being generated.
+
+    feed() takes the next chunk of streamed text and returns the events it completed:
+        ("scene", description)       once, as soon as the scene description is finished
+        ("line", character, text)    for every finished line of dialogue
+    finish() flushes whatever is left when the stream ends.
+    """
+
+    def __init__(self, max_description_words=100):
+        self.max_description_words = max_description_words
+        self._pending = ""
+        self._description = []
+        self._scene_sent = False
+        self._character = None
+        self._speech = []
+
+    def feed(self, chunk):
+        events = []
+        self._pending += chunk
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._handle_line(line, events)
+        return events
+
+    def finish(self):
+        events = []
+        if self._pending:
+            self._handle_line(self._pending, events)
+            self._pending = ""
+        self._end_speech(events)
+        self._end_description(events)
+        return events
+
+    def _handle_line(self, line, events):
+        stripped = line.strip()
+        if not stripped:
+            if self._speech:
+                self._end_speech(events)
+            return
+
+        if SLUGLINE.match(stripped):
+            self._end_speech(events)
+            self._add_description(stripped)
+            return
+
+        cue = CUE.match(stripped)
+        if cue and cue.group(1).strip():
+            self._end_speech(events)
+            self._end_description(events)
+            self._character = cue.group(1).strip()
+            return
+
+        inline = INLINE.match(stripped)
+        if inline and (inline.group(1).isupper() or inline.group(2).lstrip("*").startswith(('"', '“'))):
+            self._end_speech(events)
+            self._end_description(events)
+            text = clean_text(inline.group(2))
+            if text:
+                events.append(("line", inline.group(1).strip(), text))
+            return
+
+        if self._character and PARENTHETICAL.match(stripped):
+            return  # *(softly)* under a cue is direction, not action
+
+        if self._character and not ITALIC_ACTION.match(stripped):
+            self._speech.append(clean_text(stripped))
+            return
+
+        # Action / description
+        self._end_speech(events)
+        self._add_description(stripped)
+
+    def _add_description(self, text):
+        if not self._scene_sent:
+            self._description.append(clean_text(text))
+
+    def _end_description(self, events):
+        if self._scene_sent:
+            return
+        words = " ".join(self._description).split()
+        if words:
+            events.append(("scene", " ".join(words[:self.max_description_words])))
+            self._scene_sent = True
+
+    def _end_speech(self, events):
+        text = " ".join(part for part in self._speech if part)
+        if self._character and text:
+            events.append(("line", self._character, text))
+        self._character = None
+        self._speech = []
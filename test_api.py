@@ -112,6 +112,48 @@ def test_generate_dialogue_audio():
         print(f"❌ Generate dialogue audio (download) failed: {e}\n")
         return False
 
+def test_generate_dialogue_audio_formats():
+    """Test that each output format returns matching bytes and that repeats are cached"""
+    print("🔍 Testing generate dialogue audio (formats)...")
+    try:
+        expected_types = {
+            "mp3_64": "audio/mpeg",
+            "wav": "audio/wav",
+            "opus": "audio/ogg",
+        }
+        for output_format, mimetype in expected_types.items():
+            payload = {
+                "text": "Testing one output format at a time.",
+                "voice_id": "rachel",
+                "output_format": output_format
+            }
+            first = requests.post(f"{BASE_URL}/generate-dialogue-audio", json=payload)
+            start = time.time()
+            second = requests.post(f"{BASE_URL}/generate-dialogue-audio", json=payload)
+            repeat_ms = (time.time() - start) * 1000
+            
+            print(f"{output_format} - Status: {first.status_code}, Content-Type: {first.headers.get('Content-Type')}")
+            print(f"   Repeat request: {repeat_ms:.0f} ms, identical: {first.content == second.content}")
+            if first.status_code != 200 or not first.headers.get('Content-Type', '').startswith(mimetype):
+                print(f"❌ Failed: {first.text[:200]}")
+                return False
+            if output_format == "wav" and not first.content.startswith(b"RIFF"):
+                print("❌ WAV response is not a RIFF file")
+                return False
+        
+        # Unsupported formats are rejected up front
+        response = requests.post(
+            f"{BASE_URL}/generate-dialogue-audio",
+            json={"text": "Test text", "output_format": "xyz"}
+        )
+        print(f"Unsupported format - Status: {response.status_code}")
+        
+        print("✅ Generate dialogue audio (formats) passed\n")
+        return True
+    except Exception as e:
+        print(f"❌ Generate dialogue audio (formats) failed: {e}\n")
+        return False
+
 def test_generate_dialogue_audio_stream():
     """Test generating dialogue audio as streaming response"""
     print("🔍 Testing generate dialogue audio (stream)...")
@@ -180,6 +222,74 @@ def test_generate_dialogue_audio_info():
         print(f"❌ Generate dialogue audio info failed: {e}\n")
         return False
 
+def test_audio_url_caching():
+    """Test fetching generated audio by URL with ETag revalidation and Range requests"""
+    print("🔍 Testing audio URL caching...")
+    try:
+        payload = {
+            "text": "This clip should be served from the cache on replay.",
+            "voice_id": "rachel"
+        }
+        info = requests.post(f"{BASE_URL}/generate-dialogue-audio-info", json=payload).json()
+        audio_url = f"{BASE_URL}{info['audio_url']}"
+        
+        response = requests.get(audio_url)
+        etag = response.headers.get('ETag')
+        print(f"Status: {response.status_code}, ETag: {etag}")
+        print(f"Cache-Control: {response.headers.get('Cache-Control')}")
+        
+        revalidated = requests.get(audio_url, headers={"If-None-Match": etag})
+        print(f"If-None-Match - Status: {revalidated.status_code}")
+        
+        partial = requests.get(audio_url, headers={"Range": "bytes=0-1023"})
+        print(f"Range - Status: {partial.status_code}, Content-Range: {partial.headers.get('Content-Range')}")
+        
+        if response.status_code != 200 or revalidated.status_code != 304 or partial.status_code != 206:
+            print("❌ Failed: unexpected status codes")
+            return False
+        
+        print("✅ Audio URL caching passed\n")
+        return True
+    except Exception as e:
+        print(f"❌ Audio URL caching failed: {e}\n")
+        return False
+
+def test_render_scene():
+    """Test rendering a scene and following its event stream"""
+    print("🔍 Testing scene rendering (SSE)...")
+    try:
+        payload = {
+            "script": '**RILEY**\n"...Hey."\n\n**JAMIE**\n"...Riley?"\n\n**RILEY**\n"Yeah. It\'s been a while."'
+        }
+        response = requests.post(f"{BASE_URL}/scenes", json=payload)
+        print(f"Status: {response.status_code}")
+        print(f"Response: {response.json()}")
+        if response.status_code != 202:
+            print(f"❌ Failed: {response.text}")
+            return False
+        
+        start = time.time()
+        events = requests.get(f"{BASE_URL}{response.json()['events_url']}", stream=True, timeout=120)
+        event_type = None
+        clips = 0
+        for raw_line in events.iter_lines(decode_unicode=True):
+            if raw_line.startswith("event: "):
+                event_type = raw_line[len("event: "):]
+            elif raw_line.startswith("data: "):
+                data = json.loads(raw_line[len("data: "):])
+                print(f"   {time.time() - start:.1f}s {event_type}: {data.get('audio_url')} ({data.get('duration_ms')} ms)")
+                if event_type == "clip":
+                    clips += 1
+                elif event_type == "error":
+                    print(f"❌ Failed: {data}")
+                    return False
+        
+        print(f"✅ Scene rendering passed ({clips} clips)\n")
+        return True
+    except Exception as e:
+        print(f"❌ Scene rendering failed: {e}\n")
+        return False
+
 def test_error_handling():
     """Test error handling with invalid requests"""
     print("🔍 Testing error handling...")
@@ -248,8 +358,11 @@ def main():
         tests = [
             test_get_voices,
             test_generate_dialogue_audio,
+            test_generate_dialogue_audio_formats,
             test_generate_dialogue_audio_stream,
             test_generate_dialogue_audio_info,
+            test_audio_url_caching,
+            test_render_scene,
             test_error_handling
         ]
         
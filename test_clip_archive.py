@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+import clip_archive
+from clip_archive import ClipArchive
+
+CLIPS = {f"line{i}.mp3": bytes([i]) * (100 + i) for i in range(1, 6)}
+
+def fill(archive):
+    for name, data in CLIPS.items():
+        archive.add(name, data)
+
+def pack_size(archive):
+    return os.path.getsize(archive.pack_path)
+
+def test_link_reuses_stored_bytes(tmp_path):
+    with ClipArchive(tmp_path / "clips") as archive:
+        archive.add("a.mp3", b"hello", key="11" * 32)
+        size = pack_size(archive)
+
+        assert archive.link("b.mp3", "11" * 32)
+        assert not archive.link("c.mp3", "22" * 32)
+        archive.add("d.mp3", b"hello", key="11" * 32)
+
+        assert pack_size(archive) == size
+        assert bytes(archive.get("b.mp3")) == bytes(archive.get("d.mp3")) == b"hello"
+        assert archive.key("b.mp3") == "11" * 32
+        assert "c.mp3" not in archive
+
+def test_torn_index_tail_is_ignored_and_truncated(tmp_path):
+    with ClipArchive(tmp_path / "clips") as archive:
+        fill(archive)
+    with open(f"{tmp_path / 'clips'}.idx", "ab") as index:
+        index.write(b"\x01" * (clip_archive.RECORD.size + 3))  # a writer died mid-append
+
+    with ClipArchive(tmp_path / "clips") as archive:
+        assert archive.names() == list(CLIPS)
+        archive.add("new.mp3", b"after the crash")
+
+    with ClipArchive(tmp_path / "clips") as archive:
+        assert archive.names() == list(CLIPS) + ["new.mp3"]
+        assert bytes(archive.get("new.mp3")) == b"after the crash"
+
+def test_compact_while_another_instance_is_open(tmp_path):
+    writer = ClipArchive(tmp_path / "clips")
+    reader = ClipArchive(tmp_path / "clips")
+    fill(writer)
+    held = reader.get("line5.mp3")  # a view into the mapping from before the compaction
+    writer.remove("line1.mp3")
+    writer.add("line2.mp3", b"replaced")
+    size = pack_size(writer)
+
+    assert writer.compact() > 0
+    assert pack_size(writer) < size
+
+    assert bytes(held) == CLIPS["line5.mp3"]
+    assert "line1.mp3" not in reader
+    assert bytes(reader.get("line2.mp3")) == b"replaced"
+    assert bytes(reader.get("line4.mp3")) == CLIPS["line4.mp3"]
+
+    reader.add("from_reader.mp3", b"written after compaction")
+    assert bytes(writer.get("from_reader.mp3")) == b"written after compaction"
+    writer.close()
+    reader.close()
+
+def interrupted_compaction(tmp_path, monkeypatch, replaces_before_crash):
+    """Compacts an archive, dying after replaces_before_crash of its two renames."""
+    archive = ClipArchive(tmp_path / "clips")
+    fill(archive)
+    archive.remove("line3.mp3")
+
+    real_replace = os.replace
+    calls = []
+
+    def replace(src, dst):
+        if len(calls) == replaces_before_crash:
+            raise KeyboardInterrupt("killed")
+        calls.append(src)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(KeyboardInterrupt):
+        archive.compact()
+    monkeypatch.setattr(os, "replace", real_replace)
+    archive.close()
+
+@pytest.mark.parametrize("replaces_before_crash", [0, 1])
+def test_recovers_from_interrupted_compaction(tmp_path, monkeypatch, replaces_before_crash):
+    # 0: died before the new pack was swapped in, so it is rolled back;
+    # 1: died between the pack and index swaps, so the new index is installed
+    interrupted_compaction(tmp_path, monkeypatch, replaces_before_crash)
+    assert os.path.exists(f"{tmp_path / 'clips'}.idx.compact")
+
+    with ClipArchive(tmp_path / "clips") as archive:
+        expected = [name for name in CLIPS if name != "line3.mp3"]
+        assert archive.names() == expected
+        for name in expected:
+            assert bytes(archive.get(name)) == CLIPS[name]
+    assert not os.path.exists(f"{tmp_path / 'clips'}.idx.compact")
+    assert not os.path.exists(f"{tmp_path / 'clips'}.pack.compact")
+
+def test_mismatched_index_is_rejected(tmp_path):
+    ClipArchive(tmp_path / "one").close()
+    ClipArchive(tmp_path / "two").close()
+    os.replace(f"{tmp_path / 'two'}.idx", f"{tmp_path / 'one'}.idx")
+    with pytest.raises(clip_archive.ArchiveError):
+        ClipArchive(tmp_path / "one")
@@ -0,0 +1,72 @@
+import os
+
+from script_stream import ScriptStreamParser
+
+# Screenplay in the formats the parser has to handle: cue on its own line, parenthetical on
+# the cue line and on its own line, italic action between lines, and inline cues.
+SCRIPT = """EXT. LAKESIDE PARK - EARLY MORNING
+
+*Mist hangs over the water. JAMIE sits on a bench with a paper cup of coffee.*
+
+**RILEY**
+*(softly, unsure)*
+"...Hey."
+
+*JAMIE's eyes snap to Riley.*
+
+**JAMIE** *(blinking)*
+"...Riley?"
+
+**RILEY**
+"Yeah. It's been a while."
+
+**JAMIE**: "A while? That's… generous."
+RILEY: "Feels shorter."
+
+**JAMIE**
+(quietly)
+"Feels longer."
+"""
+
+EXPECTED_LINES = [
+    ("RILEY", "...Hey."),
+    ("JAMIE", "...Riley?"),
+    ("RILEY", "Yeah. It's been a while."),
+    ("JAMIE", "A while? That's… generous."),
+    ("RILEY", "Feels shorter."),
+    ("JAMIE", "Feels longer."),
+]
+
+def parse_in_chunks(text, chunk_size):
+    """Feeds text to a fresh parser chunk_size characters at a time and returns all events."""
+    parser = ScriptStreamParser()
+    events = []
+    for i in range(0, len(text), chunk_size):
+        events += parser.feed(text[i:i + chunk_size])
+    return events + parser.finish()
+
+def test_chunk_sizes():
+    """Every chunking of the stream, down to one character, must give the same events"""
+    whole = parse_in_chunks(SCRIPT, len(SCRIPT))
+    for chunk_size in (1, 2, 3, 7, 16, 64):
+        assert parse_in_chunks(SCRIPT, chunk_size) == whole, f"chunks of {chunk_size} changed the events"
+
+def test_dialogue_lines():
+    """All lines come out in order with the right speaker"""
+    lines = [(e[1], e[2]) for e in parse_in_chunks(SCRIPT, 5) if e[0] == "line"]
+    assert lines == EXPECTED_LINES
+
+def test_scene_description():
+    """The scene description is sent once, before the first line"""
+    events = parse_in_chunks(SCRIPT, 5)
+    assert [i for i, e in enumerate(events) if e[0] == "scene"] == [0]
+    assert "Mist hangs over the water" in events[0][1]
+
+def test_repo_script():
+    """script.md parses to the same 18 lines streamed or whole"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "script.md")
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    lines = [e for e in parse_in_chunks(text, 7) if e[0] == "line"]
+    assert len(lines) == 18
+    assert lines == [e for e in parse_in_chunks(text, len(text)) if e[0] == "line"]
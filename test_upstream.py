@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+import upstream
+from upstream import Hedger
+
+DELAY = 0.02        # the p95 every hedger below starts with
+TIMEOUT = 5         # generous bound on waits, so a slow machine can't flake
+
+def warmed_up(budget=1.0):
+    """A hedger with enough latency samples for hedging to kick in after DELAY."""
+    hedger = Hedger("test", enabled=True, percentile=95, budget=budget)
+    for _ in range(upstream.MIN_SAMPLES):
+        hedger._record(DELAY)
+    return hedger
+
+class Attempts:
+    """Fake upstream: the n-th call runs behaviours[n] and the start times are recorded."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.started = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.started.append(time.perf_counter())
+            behaviour = self.behaviours[len(self.started) - 1]
+        return behaviour()
+
+def test_no_hedge_while_samples_are_missing():
+    hedger = Hedger("test", enabled=True)
+    attempts = Attempts(lambda: "primary")
+    assert hedger.call(attempts) == "primary"
+    assert len(attempts.started) == 1
+    assert hedger.stats["hedged"] == 0
+
+def test_hedge_fires_after_the_percentile_delay():
+    hedger = warmed_up()
+    release = threading.Event()
+    attempts = Attempts(lambda: release.wait(TIMEOUT) and "primary", lambda: "hedge")
+    try:
+        assert hedger.call(attempts) == "hedge"
+    finally:
+        release.set()
+    assert attempts.started[1] - attempts.started[0] >= DELAY * 0.9
+    assert hedger.stats["hedged"] == 1
+    assert hedger.stats["hedge_wins"] == 1
+
+def test_fast_primary_is_not_hedged():
+    hedger = warmed_up()
+    attempts = Attempts(lambda: "primary")
+    assert hedger.call(attempts) == "primary"
+    assert len(attempts.started) == 1
+
+def test_budget_caps_hedges():
+    hedger = warmed_up(budget=0.0)
+    attempts = Attempts(lambda: time.sleep(DELAY * 3) or "primary")
+    assert hedger.call(attempts) == "primary"
+    assert len(attempts.started) == 1
+    assert hedger.stats["budget_denied"] == 1
+    assert hedger.stats["hedged"] == 0
+
+def test_tokens_are_earned_per_call():
+    hedger = warmed_up(budget=0.5)
+    slow = lambda: time.sleep(DELAY * 3) or "primary"
+    first = Attempts(slow, lambda: "hedge")
+    second = Attempts(slow, lambda: "hedge")
+    assert hedger.call(first) == "primary"      # 0.5 tokens: not enough
+    assert hedger.call(second) == "hedge"       # 1.0 tokens: one hedge
+    assert len(first.started) == 1
+    assert len(second.started) == 2
+
+def test_fast_failure_cannot_win_the_race():
+    hedger = warmed_up()
+
+    def fail():
+        raise RuntimeError("503 from upstream")
+
+    attempts = Attempts(lambda: time.sleep(DELAY * 3) or "primary", fail)
+    samples = len(hedger._latencies)
+    assert hedger.call(attempts) == "primary"
+    assert hedger.stats["hedge_wins"] == 0
+    # Only the success was recorded as a latency
+    assert len(hedger._latencies) == samples + 1
+
+def test_both_failing_raises():
+    hedger = warmed_up()
+
+    def slow_fail():
+        time.sleep(DELAY * 3)
+        raise RuntimeError("primary failed")
+
+    def fail():
+        raise RuntimeError("hedge failed")
+
+    with pytest.raises(RuntimeError):
+        hedger.call(Attempts(slow_fail, fail))
+
+def test_losing_attempt_is_discarded():
+    hedger = warmed_up()
+    release = threading.Event()
+    discarded = []
+    done = threading.Event()
+
+    def discard(result):
+        discarded.append(result)
+        done.set()
+
+    attempts = Attempts(lambda: release.wait(TIMEOUT) and "primary", lambda: "hedge")
+    assert hedger.call(attempts, discard=discard) == "hedge"
+    release.set()
+    assert done.wait(TIMEOUT)
+    assert discarded == ["primary"]
+    assert hedger.stats["saved_seconds"] > 0
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Hedging: if an upstream call is slower than the running p95, send a duplicate and take
+# whichever answers first. Off unless UPSTREAM_HEDGING=1, since a hedge can cost a second
+# generation upstream.
+HEDGING = os.environ.get("UPSTREAM_HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("UPSTREAM_HEDGE_PERCENTILE", 95))
+HEDGE_BUDGET = float(os.environ.get("UPSTREAM_HEDGE_BUDGET", 0.05))  # hedges per request
+HEDGE_BURST = 10            # most hedges that can be saved up while traffic is quiet
+MIN_SAMPLES = 20            # latencies needed before the percentile is trusted
+WINDOW = 200                # latencies the percentile is computed over
+WORKERS = int(os.environ.get("UPSTREAM_WORKERS", 32))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="upstream")
+
+class Prefetched:
+    """
+    Wraps a lazy chunk iterator (like the ElevenLabs SDK's) after pulling its first chunk,
+    so the request has really been answered by the time the wrapper exists.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._first = next(self._chunks, b"")
+
+    def __iter__(self):
+        if self._first:
+            yield self._first
+            self._first = b""
+        yield from self._chunks
+
+    def close(self):
+        close = getattr(self._chunks, "close", None)
+        if close:
+            close()
+
+class Hedger:
+    """
+    Sends calls to one upstream, hedging the slow ones.
+
+    call() runs the attempt and, if it has not returned after the running percentile of
+    recent latencies, starts a second identical attempt; the first to succeed is returned
+    and the other is discarded when it finishes. Hedges are paid for from a token bucket
+    that earns HEDGE_BUDGET tokens per call, which caps the extra upstream load.
+    """
+
+    def __init__(self, name, enabled=HEDGING, percentile=HEDGE_PERCENTILE, budget=HEDGE_BUDGET):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=WINDOW)
+        self._tokens = 0.0
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0, "saved_seconds": 0.0}
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+
+    def _record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _take_token(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.stats["budget_denied"] += 1
+            return False
+
+    def _timed(self, attempt):
+        started = time.perf_counter()
+        result = attempt()
+        latency = time.perf_counter() - started
+        self._record(latency)
+        return result, latency
+
+    def call(self, attempt, discard=None):
+        """
+        Runs attempt() (which must be safe to repeat) and returns its result. attempt must
+        raise on failure, e.g. on a non-2xx response, rather than return it: only successes
+        win the race and count towards the latency percentile. discard, if given, is called
+        on the result of an attempt that lost the race, e.g. to close it.
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            self._tokens = min(HEDGE_BURST, self._tokens + self.budget)
+        delay = self.hedge_delay() if self.enabled else None
+        if delay is None:
+            return self._timed(attempt)[0]
+
+        primary = _executor.submit(self._timed, attempt)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_token():
+            return primary.result()[0]
+
+        self._count("hedged")
+        hedge = _executor.submit(self._timed, attempt)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is None:
+                if pending:
+                    continue  # the first one failed; the other may still succeed
+                return next(iter(done)).result()[0]  # both failed: raise
+            won_at = time.perf_counter()
+            if winner is hedge:
+                self._count("hedge_wins")
+            for loser in (done | pending) - {winner}:
+                loser.add_done_callback(self._discarder(discard, won_at if winner is hedge else None))
+            return winner.result()[0]
+
+    def _discarder(self, discard, won_at):
+        def on_done(loser):
+            if loser.exception() is not None:
+                return
+            if won_at is not None:
+                # How much longer the caller would have waited for the primary
+                self._count("saved_seconds", time.perf_counter() - won_at)
+            if discard:
+                try:
+                    discard(loser.result()[0])
+                except Exception as e:
+                    logger.debug(f"Discarding losing {self.name} response failed: {e}")
+        return on_done
+
+    def metrics(self):
+        delay = self.hedge_delay()
+        with self._lock:
+            stats = dict(self.stats)
+            tokens = self._tokens
+        stats["saved_seconds"] = round(stats["saved_seconds"], 3)
+        stats.update({
+            "enabled": self.enabled,
+            "hedge_rate": round(stats["hedged"] / stats["calls"], 4) if stats["calls"] else 0.0,
+            f"p{self.percentile:g}_seconds": round(delay, 3) if delay is not None else None,
+            "budget_tokens": round(tokens, 2)
+        })
+        return stats
+
+# Shared by every module in this process
+tts = Hedger("tts")
+image = Hedger("image")
+
+def metrics():
+    return {hedger.name: hedger.metrics() for hedger in (tts, image)}
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+VOICES_URL = "https://api.elevenlabs.io/v1/voices"
+CACHE_PATH = os.environ.get("VOICE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "ai_movie_voices.json"))
+CACHE_TTL_SECONDS = int(os.environ.get("VOICE_CACHE_TTL_SECONDS", 6 * 3600))
+RETRY_SECONDS = 60  # minimum gap between refresh attempts (failed refreshes, unknown voices)
+
+# Known ElevenLabs voices, used until (or if) the upstream list can be loaded
+DEFAULT_VOICES = {
+    "rachel": "21m00Tcm4TlvDq8ikWAM",      # Female voice
+    "domi": "AZnzlk1XvdvUeBnXmlld",        # Female voice
+    "bella": "EXAVITQu4vr4xnSDxMaL",       # Female voice
+    "antoni": "ErXwobaYiN1P8YkM0tQj",      # Male voice
+    "thomas": "GBv7mTt0atIp3Br8iCZE",      # Male voice
+    "drew": "29vD33N1CtxCmqQRPOHJ",        # Male voice
+    "josh": "TxGEqnHWrfWFTfGW9XjX",        # Male voice
+    "arnold": "VR6AewLTigWG4xSOukaG",      # Male voice
+    "adam": "pNInz6obpgDQGcFmaJgB",        # Male voice
+    "sam": "yoZ06aMxZJJ28mfd3POQ",         # Male voice
+    "default": "21m00Tcm4TlvDq8ikWAM"     # Default voice
+}
+
+# Script character name to voice (name or ID)
+CHARACTER_VOICES = {
+    "RILEY": "rachel",
+    "JAMIE": "drew"
+}
+
+class UnknownVoiceError(ValueError):
+    """Raised when a voice name or ID is not in the catalog."""
+
+class VoiceCatalog:
+    """
+    Voice names and IDs for the ElevenLabs account, loaded once and cached on disk.
+
+    Lookups are plain dict/set hits. When the cache is older than the TTL it is refreshed in
+    a background thread while the stale list keeps serving.
+    """
+
+    def __init__(self, api_key=None, cache_path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS):
+        self.api_key = api_key or os.environ.get("ELEVENLABS_API_KEY")
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.fetched_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._loaded = False
+        self._last_attempt = 0
+        self._install([])
+
+    def _install(self, upstream_voices):
+        by_name = dict(DEFAULT_VOICES)
+        for voice in upstream_voices:
+            name = (voice["name"] or "").strip().lower()
+            if not name:
+                continue  # unnamed voices can still be used by ID
+            by_name.setdefault(name, voice["voice_id"])
+            by_name.setdefault(name.split()[0], voice["voice_id"])
+        ids = set(by_name.values()) | {voice["voice_id"] for voice in upstream_voices}
+        characters = {
+            character: by_name.get(voice.lower(), voice)
+            for character, voice in CHARACTER_VOICES.items()
+        }
+        # Swap whole objects so readers never see a half-built catalog
+        self._by_name, self._ids, self._characters = by_name, ids, characters
+
+    def _load(self):
+        """First use: take the disk cache if there is one, otherwise fetch synchronously."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                self._install(cached["voices"])
+                self.fetched_at = cached["fetched_at"]
+                logger.info(f"Loaded {len(cached['voices'])} voices from {self.cache_path}")
+                return
+            except (OSError, ValueError, KeyError):
+                pass
+        self.refresh()
+
+    def refresh(self):
+        """Fetches the voice list from ElevenLabs and rewrites the disk cache."""
+        if not self.api_key:
+            return
+        self._last_attempt = time.time()
+        try:
+            response = requests.get(VOICES_URL, headers={"xi-api-key": self.api_key}, timeout=10)
+            response.raise_for_status()
+            voices = [
+                {"voice_id": v["voice_id"], "name": v["name"]}
+                for v in response.json().get("voices", [])
+            ]
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Could not refresh voice list: {e}")
+            return
+
+        self._install(voices)
+        self.fetched_at = time.time()
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "voices": voices}, f)
+        os.replace(tmp_path, self.cache_path)
+        logger.info(f"Refreshed voice list: {len(voices)} voices")
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def _start_refresh(self):
+        """Refreshes in a background thread, at most one at a time and once per RETRY_SECONDS."""
+        if not self.api_key or time.time() - self._last_attempt <= RETRY_SECONDS or self._refreshing:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self._load()
+        if time.time() - self.fetched_at > self.ttl_seconds:
+            self._start_refresh()
+
+    def resolve(self, name_or_id):
+        """Returns the voice ID for a voice name or ID, or raises UnknownVoiceError."""
+        self._ensure_fresh()
+        voice_id = self._lookup(name_or_id)
+        if voice_id is None:
+            # Maybe the voice was added to the account since the last refresh. Check in the
+            # background rather than stall this request; a retry will find it.
+            self._start_refresh()
+            raise UnknownVoiceError(f"Unknown voice: '{name_or_id}'")
+        return voice_id
+
+    def _lookup(self, name_or_id):
+        key = name_or_id.strip()
+        if key in self._ids:
+            return key
+        return self._by_name.get(key.lower())
+
+    def character_voice(self, character):
+        """Returns the voice ID assigned to a script character, or None."""
+        self._ensure_fresh()
+        return self._characters.get(character.strip().upper())
+
+    def voices(self):
+        """All voice names with their IDs."""
+        self._ensure_fresh()
+        return dict(self._by_name)
+
+# Shared by every module in this process
+catalog = VoiceCatalog()